@@ -0,0 +1,109 @@
+from django.db.models import Count, F, FloatField, Max, Min, Sum, Window
+from django.db.models.functions import Cast, NullIf, RowNumber
+
+from .models import EXPENSE_CATEGORIES, Expense, ExpenseRollup
+from .money import dollars
+
+TRAILING_WINDOWS = (3, 12)
+NORMALIZATIONS = ('unit', 'sqft')
+
+
+def period_key(year, month):
+    """Months since year 0, so (year, month) pairs compare and subtract as integers."""
+    return year * 12 + month - 1
+
+
+def per_divisor(per, prefix='property__'):
+    """
+    Divisor expression for a normalization: the property's unit count
+    ('unit') or its stored average unit square footage ('sqft'). Zero
+    becomes NULL so unnormalizable rows come back as null, not an error.
+    """
+    if per == 'unit':
+        return Cast(NullIf(F(f'{prefix}units'), 0), FloatField())
+    return NullIf(F(f'{prefix}avg_sqft'), 0.0)
+
+
+def trailing_query(window, expenses=None, per=None):
+    """
+    The values queryset behind trailing_totals; iterate it (sync or async)
+    and pass each row through trailing_row.
+    """
+    if expenses is None:
+        expenses = Expense.objects.all()
+    ranked = expenses.annotate(
+        rn=Window(
+            RowNumber(),
+            partition_by=[F('property')],
+            order_by=[F('year').desc(), F('month').desc()],
+        )
+    ).filter(rn__lte=window)
+
+    period = period_key(F('year'), F('month'))
+    sums = {k: Sum(k) for k in EXPENSE_CATEGORIES}
+    if per:
+        divisor = per_divisor(per)
+        sums = {k: Sum(F(k) / divisor) for k in EXPENSE_CATEGORIES}
+
+    return (
+        Expense.objects.filter(pk__in=ranked.values('pk'))
+        .values('property')
+        .annotate(months=Count('id'), first=Min(period), last=Max(period), **sums)
+        .order_by('property')
+    )
+
+
+def trailing_row(row):
+    first, last = row.pop('first'), row.pop('last')
+    row['start_year'], row['start_month'] = divmod(first, 12)
+    row['end_year'], row['end_month'] = divmod(last, 12)
+    row['start_month'] += 1
+    row['end_month'] += 1
+    for k in EXPENSE_CATEGORIES:
+        row[k] = dollars(row[k])
+    return row
+
+
+def trailing_totals(window, expenses=None, per=None):
+    """
+    One row per property with the category sums over its latest `window`
+    expense months. `expenses` is an optionally pre-filtered Expense
+    queryset (e.g. by property or an `end` period); `per` is None, 'unit'
+    or 'sqft'. Ranking and summing both happen in the database; plain sums
+    add integer cents there and become dollars only on the way out.
+    """
+    return map(trailing_row, trailing_query(window, expenses, per))
+
+
+def rollup_query(window, rollups=None, per=None):
+    """The values queryset behind rollup_totals; pass each row through rollup_row."""
+    if rollups is None:
+        rollups = ExpenseRollup.objects.all()
+    columns = {k: F(f't{window}_{k}') for k in EXPENSE_CATEGORIES}
+    if per:
+        divisor = per_divisor(per)
+        columns = {k: col / divisor for k, col in columns.items()}
+    return (
+        rollups.filter(is_latest=True)
+        .values('property', 'year', 'month', months=F(f't{window}_months'),
+                first=F(f't{window}_first'), **columns)
+        .order_by('property')
+    )
+
+
+def rollup_row(row):
+    first = row.pop('first')
+    row['start_year'], row['start_month'] = divmod(first, 12)
+    row['start_month'] += 1
+    row['end_year'], row['end_month'] = row.pop('year'), row.pop('month')
+    for k in EXPENSE_CATEGORIES:
+        row[k] = dollars(row[k])
+    return row
+
+
+def rollup_totals(window, rollups=None, per=None):
+    """
+    Same rows as trailing_totals(window), read from each property's latest
+    ExpenseRollup: one indexed row per property, no expense scan.
+    """
+    return map(rollup_row, rollup_query(window, rollups, per))
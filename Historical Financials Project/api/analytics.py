@@ -0,0 +1,114 @@
+from itertools import chain
+
+import numpy as np
+
+from .models import Property
+from .money import CENTS
+
+WHISKER_IQR = 1.5  # same extent as the Altair box plots
+
+
+def _quantile(values, starts, counts, q):
+    """Linear-interpolated quantile of every sorted group at once."""
+    pos = starts + q * (counts - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def box_stats(groups, values):
+    """
+    Box-plot statistics for each distinct id in `groups` over `values`
+    (parallel 1-d arrays), computed with one sort and reductions over the
+    group boundaries instead of a Python loop per group. Returns a dict of
+    parallel arrays keyed by statistic, plus per-group outlier lists.
+    """
+    keep = ~np.isnan(values)
+    groups, values = groups[keep], values[keep]
+    if not len(values):
+        return {'group': np.array([], dtype=np.int64), 'outliers': []}
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    ids, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+
+    q1 = _quantile(values, starts, counts, 0.25)
+    median = _quantile(values, starts, counts, 0.5)
+    q3 = _quantile(values, starts, counts, 0.75)
+    iqr = q3 - q1
+    low_fence = np.repeat(q1 - WHISKER_IQR * iqr, counts)
+    high_fence = np.repeat(q3 + WHISKER_IQR * iqr, counts)
+    inside = (values >= low_fence) & (values <= high_fence)
+
+    # whiskers reach the most extreme values still inside the fences
+    lower = np.minimum.reduceat(np.where(inside, values, np.inf), starts)
+    upper = np.maximum.reduceat(np.where(inside, values, -np.inf), starts)
+    outliers = np.split(np.where(inside, np.nan, values), starts[1:])
+
+    return {
+        'group': ids,
+        'n': counts,
+        'min': values[starts],
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'max': values[starts + counts - 1],
+        'lower_whisker': lower,
+        'upper_whisker': upper,
+        'outliers': [o[~np.isnan(o)] for o in outliers],
+    }
+
+
+def _records(stats, label, labels):
+    rows = []
+    for i, group in enumerate(stats['group']):
+        row = {label: labels[group]} if labels is not None else {label: int(group)}
+        row.update({
+            k: float(stats[k][i]) for k in
+            ('min', 'q1', 'median', 'q3', 'max', 'lower_whisker', 'upper_whisker')
+        })
+        row['n'] = int(stats['n'][i])
+        row['outliers'] = stats['outliers'][i].tolist()
+        rows.append(row)
+    return rows
+
+
+def distribution(amounts, category, per=None):
+    """
+    Per-property and per-property_type box-plot stats of `category`, given
+    its (property_id, cents) pairs as a values_list queryset (see
+    api.facts.category_amounts). `per` is None, 'unit' or 'sqft'; the
+    divisor is the property's unit count or stored average unit square footage.
+    The pairs are loaded once as compact arrays.
+    """
+    flat = np.fromiter(
+        chain.from_iterable(amounts.iterator(chunk_size=20000)),
+        dtype=np.float64,
+    )
+    prop_ids = flat[0::2].astype(np.int64)
+    values = flat[1::2] / CENTS
+
+    # per-property lookups are built once and broadcast back via `inverse`
+    uniq, inverse = np.unique(prop_ids, return_inverse=True)
+    meta = {p.pk: p for p in Property.objects.filter(pk__in=uniq.tolist())}
+    ordered = [meta[pk] for pk in uniq.tolist()]
+
+    if per:
+        divisor = np.array(
+            [(p.units if per == 'unit' else p.avg_sqft) or np.nan for p in ordered], dtype=np.float64
+        )
+        values = values / divisor[inverse]
+
+    types = sorted({p.property_type for p in ordered})
+    type_index = {t: i for i, t in enumerate(types)}
+    prop_type = np.array([type_index[p.property_type] for p in ordered], dtype=np.int64)[inverse]
+
+    by_property = _records(box_stats(prop_ids, values), 'property', None)
+    for row in by_property:
+        p = meta[row['property']]
+        row['name'], row['property_type'] = p.name, p.property_type
+    return {
+        'category': category,
+        'per': per,
+        'properties': by_property,
+        'property_types': _records(box_stats(prop_type, values), 'property_type', types),
+    }
@@ -0,0 +1,131 @@
+"""
+Async read endpoints under /api/async/ for dashboard traffic served by the
+ASGI entry point (myapp.asgi, e.g. `uvicorn myapp.asgi:application`).
+Each view awaits the async ORM, so a worker waiting on the database can
+serve other requests meanwhile.
+
+They accept the query parameters of their DRF counterparts and return the
+same JSON shapes and ETags; ?include=expenses on properties is refused with
+400 (use /api/properties/ for nested expenses). Pages are keyset pages on id like
+IdCursorPagination; `next` carries an ?after=<last id> cursor instead of
+DRF's opaque one, so clients that follow `next` work unchanged.
+"""
+import json
+from functools import wraps
+
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import ValidationError
+
+from .aggregates import (
+    TRAILING_WINDOWS, per_divisor, rollup_query, rollup_row, trailing_query, trailing_row,
+)
+from .caching import async_conditional
+from .filters import (
+    EXPENSE_PERIOD_PARAMS, category_list, filter_by_property, filter_expenses, filter_modified,
+    filter_properties, id_list, int_param, per_param, window_param,
+)
+from .models import EXPENSE_CATEGORIES, Expense, ExpenseRollup, Property
+from .money import CENTS
+from .pagination import IdCursorPagination
+from .renderers import JSONRows
+
+PROPERTY_FIELDS = ['id', 'name', 'units', 'property_type', 'location', 'total_sqft', 'avg_sqft']
+
+
+def _validated(view):
+    """Filter errors as the 400 bodies DRF would send."""
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except ValidationError as exc:
+            return JsonResponse(exc.detail, status=400, safe=False)
+    return wrapped
+
+
+def _page_size(params):
+    size = int_param(params, 'page_size') or IdCursorPagination.page_size
+    return max(1, min(size, IdCursorPagination.max_page_size))
+
+
+async def _keyset_page(request, qs, columns):
+    """One page of `qs.values(*columns)` rows after ?after=<id>, plus the `next` URL."""
+    params = request.GET
+    size = _page_size(params)
+    after = int_param(params, 'after')
+    if after is not None:
+        qs = qs.filter(pk__gt=after)
+    rows = [row async for row in qs.order_by('id').values(*columns)[:size + 1]]
+    next_url = None
+    if len(rows) > size:
+        rows = rows[:size]
+        query = params.copy()
+        query['after'] = rows[-1]['id']
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+    return rows, next_url
+
+
+def _page_response(next_url, results):
+    head = json.dumps({'next': next_url, 'previous': None}, separators=(',', ':')).encode()
+    return HttpResponse(head[:-1] + b',"results":' + results + b'}', content_type='application/json')
+
+
+@require_safe
+@_validated
+@async_conditional('properties')
+async def properties(request):
+    """GET /api/async/properties/: the property list with its id and property-level filters."""
+    params = request.GET
+    if params.get('include'):
+        raise ValidationError({'include': ['Not supported here; use /api/properties/?include=expenses.']})
+    qs = filter_modified(filter_properties(Property.objects.all(), params), params)
+    ids = id_list(params, 'id')
+    if ids:
+        qs = qs.filter(pk__in=ids)
+    rows, next_url = await _keyset_page(request, qs, PROPERTY_FIELDS)
+    return _page_response(next_url, json.dumps(rows, separators=(',', ':')).encode())
+
+
+@require_safe
+@_validated
+@async_conditional('expenses', 'properties')
+async def expenses(request):
+    """
+    GET /api/async/expenses/: JSON expense pages with the list filters,
+    ?category= and ?per_unit=1|per_sqft=1, formatted like the sync fast path.
+    """
+    params = request.GET
+    qs = filter_modified(filter_expenses(Expense.objects.all(), params), params)
+    categories = category_list(params) or EXPENSE_CATEGORIES
+    per = per_param(params)
+    kind = 'cents'
+    sources = list(categories)
+    if per:
+        kind = 'float'
+        qs = qs.annotate(divisor=per_divisor(per)).annotate(**{
+            f'{k}_per': F(k) / F('divisor') / CENTS for k in categories
+        })
+        sources = [f'{k}_per' for k in categories]
+    fields = [('id', 'int'), ('month', 'int'), ('year', 'int')] + [(k, kind) for k in categories]
+    fields.append(('property', 'int'))
+    rows, next_url = await _keyset_page(request, qs, ['id', 'month', 'year', *sources, 'property'])
+    return _page_response(next_url, JSONRows(rows, fields).render())
+
+
+@require_safe
+@_validated
+@async_conditional('expenses', 'properties')
+async def trailing(request):
+    """GET /api/async/expenses/trailing/: the T3/T12 summaries of ExpenseViewSet.trailing."""
+    params = request.GET
+    window = window_param(params, TRAILING_WINDOWS)
+    per = per_param(params)
+    if any(params.get(p) for p in EXPENSE_PERIOD_PARAMS):
+        filtered = filter_expenses(Expense.objects.all(), params)
+        rows = [trailing_row(row) async for row in trailing_query(window, filtered, per)]
+    else:
+        rollups = filter_by_property(ExpenseRollup.objects.all(), params)
+        rows = [rollup_row(row) async for row in rollup_query(window, rollups, per)]
+    return JsonResponse(rows, safe=False)
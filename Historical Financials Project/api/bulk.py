@@ -0,0 +1,115 @@
+from django.db import transaction
+
+from .facts import normalized, sync_facts
+from .footage import mark_units_dirty
+from .models import EXPENSE_CATEGORIES, Expense, Property, Unit
+from .rollups import mark_expenses_dirty
+from .serializers import BulkExpenseSerializer, BulkUnitSerializer
+from .versioning import resource_for, touch
+
+BATCH_SIZE = 500
+
+
+def _attnames(model, key_fields):
+    return [model._meta.get_field(f).attname for f in key_fields]
+
+
+def _key(obj, attnames):
+    return tuple(getattr(obj, a) for a in attnames)
+
+
+def _existing(model, keys, attnames):
+    """Keys already stored, fetched with one IN query per key column."""
+    lookup = {f'{a}__in': {k[i] for k in keys} for i, a in enumerate(attnames)}
+    found = model.objects.filter(**lookup).values_list(*attnames)
+    return {k for k in found if k in keys}
+
+
+def bulk_upsert(model, serializer_class, rows, key_fields, update_fields, after_write=None):
+    """
+    Validate `rows` (a list of dicts) and insert or update them on the
+    unique constraint over `key_fields` in a single transaction. Invalid
+    rows are reported and skipped; the rest are written. bulk_create sends
+    no model signals, so `after_write(objs)` is called inside the
+    transaction with the written instances instead, and the model's
+    resource version is bumped there too. Returns a summary
+    with one status entry per input row, in input order.
+    """
+    attnames = _attnames(model, key_fields)
+    results = [None] * len(rows)
+    pending = {}
+    for i, row in enumerate(rows):
+        ser = serializer_class(data=row)
+        if not ser.is_valid():
+            results[i] = {'index': i, 'status': 'error', 'errors': ser.errors}
+            continue
+        data = dict(ser.validated_data)
+        obj = model(property_id=data.pop('property'), **data)
+        key = _key(obj, attnames)
+        if key in pending:
+            # last row for a key wins, like consecutive single upserts would
+            prev = pending[key][0]
+            results[prev] = {'index': prev, 'status': 'duplicate'}
+        pending[key] = (i, obj)
+
+    known = set(Property.objects.filter(
+        pk__in={obj.property_id for _, obj in pending.values()}
+    ).values_list('pk', flat=True))
+    for key, (i, obj) in list(pending.items()):
+        if obj.property_id not in known:
+            results[i] = {'index': i, 'status': 'error',
+                          'errors': {'property': ['Invalid pk - object does not exist.']}}
+            del pending[key]
+
+    with transaction.atomic():
+        # the lookup only labels rows; ON CONFLICT does the actual merge
+        existing = _existing(model, set(pending), attnames) if pending else set()
+        for key, (i, obj) in pending.items():
+            status = 'updated' if key in existing else 'created'
+            results[i] = {'index': i, 'status': status}
+        written = [obj for _, obj in pending.values()]
+        model.objects.bulk_create(
+            written,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=key_fields,
+            update_fields=update_fields,
+        )
+        if after_write:
+            after_write(written)
+        if written:
+            touch(resource_for(model))
+
+    summary = {'created': 0, 'updated': 0, 'duplicate': 0, 'error': 0}
+    for r in results:
+        summary[r['status']] += 1
+    return {**summary, 'results': results}
+
+
+def _expenses_written(expenses):
+    mark_expenses_dirty(expenses)
+    if normalized():
+        sync_facts(expenses)
+
+
+def upsert_expenses(rows):
+    """
+    Expense months keyed on (property, year, month); rollups follow on
+    commit, normalized facts are upserted in the same transaction.
+    """
+    return bulk_upsert(
+        Expense, BulkExpenseSerializer, rows,
+        key_fields=['property', 'year', 'month'],
+        update_fields=EXPENSE_CATEGORIES + ['updated_at'],
+        after_write=_expenses_written,
+    )
+
+
+def upsert_units(rows):
+    """Units keyed on (property, unit_number); square footage totals follow."""
+    return bulk_upsert(
+        Unit, BulkUnitSerializer, rows,
+        key_fields=['property', 'unit_number'],
+        update_fields=['square_footage', 'updated_at'],
+        after_write=mark_units_dirty,
+    )
@@ -0,0 +1,24 @@
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class BoundedLocMemCache(LocMemCache):
+    """
+    LocMemCache bounded in bytes as well as entries: once the pickled values
+    exceed OPTIONS['MAX_BYTES'], least recently used entries are dropped
+    until they fit again.
+    """
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._max_bytes = int(params.get('OPTIONS', {}).get('MAX_BYTES', 0)) or None
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        super()._set(key, value, timeout)
+        if self._max_bytes is None:
+            return
+        size = sum(map(len, self._cache.values()))
+        while size > self._max_bytes and len(self._cache) > 1:
+            # the most recently used entry is first, the least recently used last
+            stale, pickled = self._cache.popitem()
+            del self._expire_info[stale]
+            size -= len(pickled)
@@ -0,0 +1,131 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .versioning import acurrent, current
+
+
+def _cache_key(request):
+    # one entry per URL and representation; a newer generation's body replaces it
+    key = repr((request.get_full_path(), request.headers.get('Accept', '')))
+    return 'api-response:%s' % hashlib.sha1(key.encode()).hexdigest()
+
+
+def _validators(request, versions):
+    """(ETag, Last-Modified timestamp) for a read given its resource versions."""
+    key = repr((
+        sorted(versions.items()), request.get_full_path(), request.headers.get('Accept', ''),
+    ))
+    etag = '"%s"' % hashlib.sha1(key.encode()).hexdigest()[:24]
+    modified = [m for _, m in versions.values() if m]
+    return etag, max(modified).timestamp() if modified else None
+
+
+def _with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def _not_modified(request, etag, last_modified):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return None if response is None else _with_validators(response, etag, last_modified)
+
+
+def _from_cache(hit, etag, last_modified):
+    if hit is None or hit[0] != etag:  # missing, or rendered under an older generation
+        return None
+    _, content, content_type = hit
+    return _with_validators(HttpResponse(content, content_type=content_type), etag, last_modified)
+
+
+def _cacheable(response):
+    return (
+        response.status_code == 200 and not response.streaming
+        and len(response.content) <= settings.RESPONSE_CACHE_MAX_BYTES
+    )
+
+
+class ConditionalGetMixin:
+    """
+    Versioned reads for a viewset. GET/HEAD responses carry an ETag derived
+    from the generations of the resources in `cache_resources` plus the
+    URL and Accept header, and a Last-Modified of their latest write.
+    Matching If-None-Match / If-Modified-Since requests get a bodyless 304.
+    Rendered bodies up to RESPONSE_CACHE_MAX_BYTES are kept in the
+    'responses' cache, one entry per URL and Accept header together with
+    the ETag they were rendered under; a write bumps a generation, so the
+    entry stops matching and the next render replaces it. The cache is
+    bounded in bytes as well as entries (api.cache_backends). DRF responses
+    are stored from a post-render callback rather than rendered here, so
+    rendering still happens after the view returns, where
+    api.profiling times it.
+    """
+    cache_resources = ()
+
+    def get_cache_resources(self, request):
+        return self.cache_resources
+
+    def dispatch(self, request, *args, **kwargs):
+        resources = self.get_cache_resources(request)
+        if request.method not in ('GET', 'HEAD') or not resources:
+            return super().dispatch(request, *args, **kwargs)
+
+        etag, last_modified = _validators(request, current(resources))
+        not_modified = _not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        cache = caches['responses']
+        key = _cache_key(request)
+        hit = _from_cache(cache.get(key), etag, last_modified)
+        if hit is not None:
+            return hit
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200 or response.streaming:
+            return response
+
+        def store(response):
+            if _cacheable(response):
+                cache.set(key, (etag, response.content, response['Content-Type']))
+        if getattr(response, 'is_rendered', True):
+            store(response)
+        else:
+            response.add_post_render_callback(store)
+        return _with_validators(response, etag, last_modified)
+
+
+def async_conditional(*resources):
+    """ConditionalGetMixin for async function views: same ETags, 304s and response cache."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+            etag, last_modified = _validators(request, await acurrent(resources))
+            not_modified = _not_modified(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            cache = caches['responses']
+            key = _cache_key(request)
+            hit = _from_cache(await cache.aget(key), etag, last_modified)
+            if hit is not None:
+                return hit
+
+            response = await view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            if _cacheable(response):
+                await cache.aset(key, (etag, response.content, response['Content-Type']))
+            return _with_validators(response, etag, last_modified)
+        return wrapped
+    return decorator
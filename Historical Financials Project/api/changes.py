@@ -0,0 +1,132 @@
+"""
+The change feed behind /api/changes/: the property, expense and unit rows
+written since a cursor plus the tombstones of deleted ones, merged in time
+order and streamed as one JSON document,
+
+    {"cursor": "<ISO datetime>", "changes": [
+        {"resource": "expenses", "op": "insert"|"update", "id": 1, "at": ..., "data": {...}},
+        {"resource": "units", "op": "delete", "id": 7, "at": ...}, ...]}
+
+Each table is read through a server-side cursor (.iterator), so memory stays
+flat however many rows changed. Clients pass the returned cursor as the next
+?since=; the last CHANGES_CURSOR_LAG seconds come again, so changes must be
+applied idempotently, in order, keyed on (resource, id). Rows are stamped
+when written, not when their transaction commits: a write committing more
+than CHANGES_CURSOR_LAG after its stamp is missed by readers whose cursor
+passed it, so clients should also reload in full now and then.
+
+Tombstones are queued by record_deleted and written in one INSERT per
+transaction once it commits, stamped at that moment.
+"""
+import heapq
+import json
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EXPENSE_CATEGORIES, Expense, Property, Tombstone, Unit
+from .money import dollars
+
+# resource: (model, fields of its change data)
+FEEDS = {
+    'properties': (Property, ['id', 'name', 'units', 'property_type', 'location', 'total_sqft', 'avg_sqft']),
+    'expenses': (Expense, ['id', 'property', 'year', 'month', *EXPENSE_CATEGORIES]),
+    'units': (Unit, ['id', 'property', 'unit_number', 'square_footage']),
+}
+CHUNK_SIZE = 2000
+# changes per chunk of the streamed body
+BATCH = 500
+
+_state = threading.local()
+
+
+class _PendingTombstones:
+    """
+    The deletions of one transaction (or savepoint), as its on_commit
+    callback. A rolled-back savepoint or transaction drops the callback,
+    and its rows with it.
+    """
+    def __init__(self, connection):
+        self.rows = []
+        self.savepoints = list(connection.savepoint_ids)
+        self.position = len(connection.run_on_commit)
+        self.written = False
+
+    def is_open(self, connection):
+        # still queued at the current savepoint level, not yet run or rolled back
+        hooks = connection.run_on_commit
+        return (
+            not self.written and self.savepoints == connection.savepoint_ids
+            and self.position < len(hooks) and hooks[self.position][1] is self
+        )
+
+    def __call__(self):
+        self.written = True
+        now = timezone.now()
+        Tombstone.objects.bulk_create(
+            [Tombstone(resource=r, object_id=i, deleted_at=now) for r, i in self.rows],
+            batch_size=CHUNK_SIZE,
+        )
+
+
+def record_deleted(resource, object_id):
+    """Queue the tombstone of a deleted row; it is written when the deletion commits."""
+    connection = transaction.get_connection()
+    pending = getattr(_state, 'tombstones', None)
+    if pending is not None and pending.is_open(connection):
+        pending.rows.append((resource, object_id))
+        return
+    pending = _state.tombstones = _PendingTombstones(connection)
+    pending.rows.append((resource, object_id))
+    transaction.on_commit(pending)  # runs at once under autocommit
+
+
+def _writes(resource, since):
+    model, fields = FEEDS[resource]
+    rows = model.objects.all()
+    if since is not None:
+        rows = rows.filter(updated_at__gte=since)
+    rows = rows.order_by('updated_at', 'pk').values('created_at', 'updated_at', *fields)
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        created, at = row.pop('created_at'), row.pop('updated_at')
+        if resource == 'expenses':
+            row.update({k: dollars(row[k]) for k in EXPENSE_CATEGORIES})
+        op = 'insert' if since is None or created >= since else 'update'
+        yield at, {'resource': resource, 'op': op, 'id': row['id'], 'at': at, 'data': row}
+
+
+def _deletes(resources, since):
+    tombstones = (
+        Tombstone.objects.filter(resource__in=resources, deleted_at__gte=since)
+        .order_by('deleted_at', 'pk').values_list('resource', 'object_id', 'deleted_at')
+    )
+    for resource, object_id, at in tombstones.iterator(chunk_size=CHUNK_SIZE):
+        yield at, {'resource': resource, 'op': 'delete', 'id': object_id, 'at': at}
+
+
+def changes(resources, since=None):
+    """
+    Changes of `resources` at or after `since` in time order. Without
+    `since`, every current row as an insert (a client's initial snapshot).
+    """
+    streams = [_writes(r, since) for r in resources]
+    if since is not None:
+        streams.append(_deletes(resources, since))
+    for _, change in heapq.merge(*streams, key=lambda item: item[0]):
+        yield change
+
+
+def stream(cursor, resources, since=None):
+    """The feed document, encoded in chunks of BATCH changes."""
+    yield '{"cursor":%s,"changes":[' % json.dumps(cursor.isoformat())
+    batch, sep = [], ''
+    for change in changes(resources, since):
+        batch.append(json.dumps(change, cls=DjangoJSONEncoder, separators=(',', ':')))
+        if len(batch) >= BATCH:
+            yield sep + ','.join(batch)
+            batch, sep = [], ','
+    if batch:
+        yield sep + ','.join(batch)
+    yield ']}'
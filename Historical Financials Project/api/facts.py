@@ -0,0 +1,89 @@
+"""
+Normalized expense storage (settings.EXPENSE_STORAGE = 'normalized').
+
+Each Expense row is mirrored as one narrow ExpenseFact per category, keyed
+to the ExpenseCategory dimension and indexed (category, property, period),
+so reads of one category across the portfolio scan only that category's
+rows. The wide Expense row stays the write target; facts are upserted in
+the same transaction by the expense signals and bulk writes.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .filters import filter_expenses
+from .models import EXPENSE_CATEGORIES, Expense, ExpenseCategory, ExpenseFact
+
+BATCH_SIZE = 2000
+
+
+def normalized():
+    return settings.EXPENSE_STORAGE == 'normalized'
+
+
+def category_ids(category_model=ExpenseCategory):
+    """{key: pk} of the category dimension."""
+    return dict(category_model.objects.values_list('key', 'pk'))
+
+
+def _facts(expenses, ids, fact_model):
+    for e in expenses:
+        for k in EXPENSE_CATEGORIES:
+            yield fact_model(
+                expense_id=e.pk, property_id=e.property_id, year=e.year, month=e.month,
+                category_id=ids[k], amount=getattr(e, k),
+            )
+
+
+def sync_facts(expenses):
+    """Upsert the facts of saved Expense instances (one statement per batch)."""
+    ExpenseFact.objects.bulk_create(
+        list(_facts(expenses, category_ids(), ExpenseFact)),
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['expense', 'category'],
+        update_fields=['property', 'year', 'month', 'amount'],
+    )
+
+
+def rebuild_facts(expense_model=Expense, fact_model=ExpenseFact, category_model=ExpenseCategory):
+    """Recreate every fact row from the expense table in one streaming pass."""
+    ids = category_ids(category_model)
+    expenses = expense_model.objects.order_by('pk').iterator(chunk_size=BATCH_SIZE)
+    count, batch = 0, []
+    with transaction.atomic():
+        fact_model.objects.all().delete()
+        for fact in _facts(expenses, ids, fact_model):
+            batch.append(fact)
+            if len(batch) >= BATCH_SIZE:
+                fact_model.objects.bulk_create(batch)
+                count, batch = count + len(batch), []
+        fact_model.objects.bulk_create(batch)
+    return count + len(batch)
+
+
+def category_amounts(category, params):
+    """
+    (property_id, cents) pairs of one category under the expense list
+    filters: from the fact index in normalized mode, else the wide column.
+    """
+    if normalized():
+        facts = filter_expenses(ExpenseFact.objects.filter(category__key=category), params)
+        return facts.values_list('property_id', 'amount')
+    return filter_expenses(Expense.objects.all(), params).values_list('property_id', category)
+
+
+def wide_rows(headers, categories):
+    """
+    Expense header dicts (id, month, year, property) completed with the
+    cents of `categories`, read from the facts of just those categories.
+    Feeds WideExpenseSerializer, so narrow reads still answer in the wide
+    shape. Missing facts come back as None.
+    """
+    rows = {h['id']: {**h, **dict.fromkeys(categories)} for h in headers}
+    facts = (
+        ExpenseFact.objects.filter(expense__in=list(rows), category__key__in=categories)
+        .values_list('expense', 'category__key', 'amount')
+    )
+    for expense_id, key, amount in facts:
+        rows[expense_id][key] = amount
+    return list(rows.values())
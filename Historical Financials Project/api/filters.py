@@ -0,0 +1,160 @@
+"""
+Query-string filters shared by the list endpoints.
+
+Ids accept both ?property=1&property=2 and ?property=1,2. Text filters
+(property_type, location) are repeated params only, since values may
+contain commas. Periods are inclusive YYYY-MM bounds.
+"""
+from datetime import timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import EXPENSE_CATEGORIES
+
+# Expense-level filters, as opposed to the property-level ones
+EXPENSE_PERIOD_PARAMS = ('year', 'month', 'start', 'end')
+
+
+def flag(params, name):
+    return params.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def id_list(params, name):
+    raw = [v for value in params.getlist(name) for v in value.split(',') if v]
+    try:
+        return [int(v) for v in raw]
+    except ValueError:
+        raise ValidationError({name: 'Expected integer ids.'})
+
+
+def int_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'Expected an integer.'})
+
+
+def period_param(params, name):
+    """Parse YYYY-MM into (year, month)."""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        year, month = (int(v) for v in value.split('-'))
+    except ValueError:
+        raise ValidationError({name: 'Expected YYYY-MM.'})
+    if not 1 <= month <= 12:
+        raise ValidationError({name: 'Month must be between 1 and 12.'})
+    return year, month
+
+
+def per_param(params):
+    """?per_unit=1 or ?per_sqft=1 as 'unit' / 'sqft' (None when neither)."""
+    per_unit, per_sqft = flag(params, 'per_unit'), flag(params, 'per_sqft')
+    if per_unit and per_sqft:
+        raise ValidationError({'per_sqft': 'Choose either per_unit or per_sqft.'})
+    return 'unit' if per_unit else 'sqft' if per_sqft else None
+
+
+def window_param(params, windows, default=12):
+    """?window= as one of `windows` (the trailing windows with rollups)."""
+    try:
+        window = int(params.get('window', default))
+    except ValueError:
+        window = None
+    if window not in windows:
+        raise ValidationError({'window': f'Must be one of {windows}.'})
+    return window
+
+
+def datetime_param(params, name):
+    """An ISO 8601 datetime as an aware datetime (UTC when no offset is given)."""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value.replace(' ', '+'))  # an unescaped '+' arrives as a space
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({name: 'Expected an ISO 8601 datetime.'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+
+def filter_modified(qs, params):
+    """
+    Rows written at or after ?modified_since=, for incremental client
+    refreshes of the property and expense lists (models with updated_at).
+    """
+    moment = datetime_param(params, 'modified_since')
+    return qs if moment is None else qs.filter(updated_at__gte=moment)
+
+
+def choice_list(params, name, choices):
+    """?<name>=a&<name>=b or ?<name>=a,b as a sublist of `choices`, in its order (None when absent)."""
+    raw = {v for value in params.getlist(name) for v in value.split(',') if v}
+    if not raw:
+        return None
+    unknown = raw - set(choices)
+    if unknown:
+        raise ValidationError({name: f'Unknown values: {sorted(unknown)}.'})
+    return [k for k in choices if k in raw]
+
+
+def category_list(params):
+    """?category=taxes&category=insurance or ?category=taxes,insurance, in canonical order (None when absent)."""
+    return choice_list(params, 'category', EXPENSE_CATEGORIES)
+
+
+def filter_properties(qs, params, prefix=''):
+    """
+    property_type, location, units_min, units_max. `prefix` targets a
+    related property, e.g. 'property__' on Expense or Unit querysets.
+    """
+    types = params.getlist('property_type')
+    if types:
+        qs = qs.filter(**{f'{prefix}property_type__in': types})
+    locations = params.getlist('location')
+    if locations:
+        qs = qs.filter(**{f'{prefix}location__in': locations})
+    units_min = int_param(params, 'units_min')
+    if units_min is not None:
+        qs = qs.filter(**{f'{prefix}units__gte': units_min})
+    units_max = int_param(params, 'units_max')
+    if units_max is not None:
+        qs = qs.filter(**{f'{prefix}units__lte': units_max})
+    return qs
+
+
+def filter_by_property(qs, params):
+    """property ids plus the property-level filters, for Expense and Unit."""
+    ids = id_list(params, 'property')
+    if ids:
+        qs = qs.filter(property__in=ids)
+    return filter_properties(qs, params, prefix='property__')
+
+
+def filter_expenses(qs, params):
+    """filter_by_property plus year, month and a start/end period range."""
+    qs = filter_by_property(qs, params)
+    year = int_param(params, 'year')
+    if year is not None:
+        qs = qs.filter(year=year)
+    month = int_param(params, 'month')
+    if month is not None:
+        qs = qs.filter(month=month)
+    start = period_param(params, 'start')
+    if start:
+        qs = qs.filter(Q(year__gt=start[0]) | Q(year=start[0], month__gte=start[1]))
+    end = period_param(params, 'end')
+    if end:
+        qs = qs.filter(Q(year__lt=end[0]) | Q(year=end[0], month__lte=end[1]))
+    return qs
@@ -0,0 +1,46 @@
+from django.db.models import Avg, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Property, Unit
+from .versioning import touch
+
+
+def _per_property(unit_model, aggregate):
+    return Subquery(
+        unit_model.objects.filter(property=OuterRef('pk'))
+        .values('property').annotate(value=aggregate).values('value')
+    )
+
+
+def refresh_footage(property_ids=None, property_model=Property, unit_model=Unit, **fields):
+    """
+    Recompute total_sqft and avg_sqft for `property_ids` (every property
+    when None) in a single UPDATE, which also sets any extra `fields`.
+    Only the touched properties' units are read, so a unit write costs one
+    indexed aggregate, not a table scan. Takes the models as arguments so
+    migrations can pass historical ones.
+    """
+    props = property_model.objects.all()
+    if property_ids is not None:
+        props = props.filter(pk__in=list(property_ids))
+    return props.update(
+        total_sqft=Coalesce(_per_property(unit_model, Sum('square_footage')), 0.0),
+        avg_sqft=_per_property(unit_model, Avg('square_footage')),
+        **fields,
+    )
+
+
+def units_changed(property_ids):
+    """
+    refresh_footage after unit writes, stamping the properties' updated_at
+    (update() skips auto_now) so ?modified_since= readers see the new totals.
+    """
+    if property_ids:
+        refresh_footage(property_ids, updated_at=timezone.now())
+        touch('properties')
+
+
+def mark_units_dirty(units):
+    """units_changed for the properties of a batch of Unit instances."""
+    units_changed({u.property_id for u in units})
@@ -0,0 +1,220 @@
+"""
+Streaming parsers for the spreadsheet templates the Streamlit pages hand
+out, run server-side by api.jobs. Writes go through callbacks so the
+parsing stays independent of how rows are stored.
+"""
+import csv
+import io
+from openpyxl import load_workbook
+
+from .models import EXPENSE_CATEGORIES as CATEGORY_KEYS
+
+PROPERTY_COLUMNS = ['property_name','units','property_type','location']
+EXPECTED_COLUMNS = PROPERTY_COLUMNS + ['month','year'] + CATEGORY_KEYS
+UNIT_COLUMNS = ['property_name','unit_number','square_footage']
+
+# Expense rows buffered before each bulk write
+CHUNK_ROWS = 1000
+
+
+class TemplateError(ValueError):
+    """The upload is not a readable copy of the expense template."""
+
+
+def _sheet_rows(uploaded, sheet='Expenses'):
+    """
+    Return (header, row_iter, total) for an .xlsx or .csv upload without
+    loading it whole: openpyxl read-only mode streams the sheet XML.
+    `total` is the data row count when the file declares one, else None.
+    """
+    if uploaded.name.lower().endswith('.csv'):
+        reader = csv.reader(io.TextIOWrapper(uploaded, encoding='utf-8-sig'))
+        header = next(reader, None)
+        return header, reader, None
+    try:
+        wb = load_workbook(uploaded, read_only=True, data_only=True)
+        ws = wb[sheet]
+    except Exception:
+        raise TemplateError(f"Unable to read '{sheet}' sheet. Please use the provided template.")
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    total = ws.max_row - 1 if ws.max_row else None
+    return header, rows, total
+
+
+def _blank(v):
+    return v is None or (isinstance(v, str) and not v.strip())
+
+
+def parse_row(values):
+    """
+    Validate one template row (dict of column -> cell value). Returns the
+    property key tuple and the expense payload, minus the property id.
+    Raises ValueError naming the offending column.
+    """
+    prop = {c: values[c] for c in PROPERTY_COLUMNS}
+    if _blank(prop['property_name']):
+        raise ValueError("property_name is empty")
+    try:
+        prop['units'] = int(float(prop['units']))
+    except (TypeError, ValueError):
+        raise ValueError(f"units is not a number: {prop['units']!r}")
+    expense = {}
+    for c in ['month', 'year']:
+        try:
+            expense[c] = int(float(values[c]))
+        except (TypeError, ValueError):
+            raise ValueError(f"{c} is not a number: {values[c]!r}")
+    if not 1 <= expense['month'] <= 12:
+        raise ValueError(f"month out of range: {expense['month']}")
+    for k in CATEGORY_KEYS:
+        try:
+            expense[k] = float(values[k])
+        except (TypeError, ValueError):
+            raise ValueError(f"{k} is not a number: {values[k]!r}")
+    key = (str(prop['property_name']).strip(), prop['units'],
+           str(prop['property_type'] or '').strip(), str(prop['location'] or '').strip())
+    return key, expense
+
+
+def _header_index(header, expected):
+    header = [str(h).strip() if h is not None else '' for h in (header or [])]
+    if not all(c in header for c in expected):
+        raise TemplateError("Template columns mismatch. Do not rename headers.")
+    return {c: header.index(c) for c in expected}
+
+
+def _values(raw, index):
+    return {c: raw[i] if i < len(raw) else None for c, i in index.items()}
+
+
+def ingest(uploaded, create_property, write_expenses, on_progress=None, chunk_rows=CHUNK_ROWS):
+    """
+    Stream the expense template into the API in a single pass.
+
+    Each distinct (property_name, units, property_type, location) is created
+    once via `create_property(payload) -> dict|None` the first time it is
+    seen; its expense rows are buffered and flushed every `chunk_rows` rows
+    through `write_expenses(rows) -> bulk summary|None`. `on_progress(read,
+    total)` is called after every flush. Returns per-property counts and
+    the list of (row_number, message) errors.
+    """
+    header, rows, total = _sheet_rows(uploaded)
+    index = _header_index(header, EXPECTED_COLUMNS)
+
+    properties = {}   # key -> {'id', 'name', 'count'} or None if creation failed
+    errors = []
+    pending = []      # (key, row_number, payload)
+    read = 0
+
+    def flush():
+        if not pending:
+            return
+        res = write_expenses([payload for _, _, payload in pending])
+        if res is None:
+            errors.append((pending[0][1], f"Failed to write {len(pending)} expense rows."))
+        else:
+            for r in res['results']:
+                key, row_number, _ = pending[r['index']]
+                if r['status'] in ('created', 'updated'):
+                    properties[key]['count'] += 1
+                elif r['status'] == 'error':
+                    errors.append((row_number, str(r['errors'])))
+        pending.clear()
+        if on_progress:
+            on_progress(read, total)
+
+    for row_number, raw in enumerate(rows, start=2):
+        if all(_blank(v) for v in raw):
+            continue
+        read += 1
+        try:
+            key, expense = parse_row(_values(raw, index))
+        except ValueError as e:
+            errors.append((row_number, str(e)))
+            continue
+
+        if key not in properties:
+            prop = create_property({
+                'name': key[0], 'units': key[1], 'property_type': key[2], 'location': key[3]
+            })
+            properties[key] = {'id': prop['id'], 'name': prop['name'], 'count': 0} if prop else None
+            if not prop:
+                errors.append((row_number, f"Failed to create property {key[0]}"))
+        if properties[key] is None:
+            continue
+
+        pending.append((key, row_number, {'property': properties[key]['id'], **expense}))
+        if len(pending) >= chunk_rows:
+            flush()
+    flush()
+
+    return {
+        'properties': [p for p in properties.values() if p],
+        'rows': read,
+        'errors': errors,
+    }
+
+
+def parse_unit_row(values):
+    """Validate one unit template row; returns (property_name, payload)."""
+    try:
+        unit_number = int(float(values['unit_number']))
+    except (TypeError, ValueError):
+        raise ValueError(f"unit_number is not a number: {values['unit_number']!r}")
+    try:
+        sqft = float(values['square_footage'])
+    except (TypeError, ValueError):
+        raise ValueError(f"square_footage is not a number: {values['square_footage']!r}")
+    return str(values['property_name'] or '').strip(), {'unit_number': unit_number, 'square_footage': sqft}
+
+
+def ingest_units(uploaded, property_id, property_name, write_units,
+                 on_progress=None, chunk_rows=CHUNK_ROWS):
+    """
+    Stream the unit square-footage template for one property. Rows naming
+    another property are skipped; the rest are flushed every `chunk_rows`
+    rows through `write_units(rows) -> bulk summary|None`. Returns
+    created/updated counts and the list of (row_number, message) errors.
+    """
+    header, rows, total = _sheet_rows(uploaded, sheet='Units')
+    index = _header_index(header, UNIT_COLUMNS)
+
+    counts = {'created': 0, 'updated': 0}
+    errors = []
+    pending = []      # (row_number, payload)
+    read = 0
+
+    def flush():
+        if not pending:
+            return
+        res = write_units([payload for _, payload in pending])
+        if res is None:
+            errors.append((pending[0][0], f"Failed to write {len(pending)} unit rows."))
+        else:
+            for r in res['results']:
+                if r['status'] in counts:
+                    counts[r['status']] += 1
+                elif r['status'] == 'error':
+                    errors.append((pending[r['index']][0], str(r['errors'])))
+        pending.clear()
+        if on_progress:
+            on_progress(read, total)
+
+    for row_number, raw in enumerate(rows, start=2):
+        if all(_blank(v) for v in raw):
+            continue
+        read += 1
+        try:
+            name, unit = parse_unit_row(_values(raw, index))
+        except ValueError as e:
+            errors.append((row_number, str(e)))
+            continue
+        if name != property_name:
+            continue
+        pending.append((row_number, {'property': property_id, **unit}))
+        if len(pending) >= chunk_rows:
+            flush()
+    flush()
+
+    return {**counts, 'rows': read, 'errors': errors}
@@ -0,0 +1,101 @@
+"""
+In-process worker for ImportJob: a small thread pool, no external broker.
+
+Jobs are handed to the pool once the transaction that created them
+commits. IMPORT_WORKERS = 0 runs each job inline at that point instead,
+which is what the tests use.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .bulk import upsert_expenses, upsert_units
+from .ingest import TemplateError, ingest, ingest_units
+from .models import ImportJob
+from .serializers import PropertySerializer
+
+logger = logging.getLogger(__name__)
+
+MAX_ERRORS = 1000  # row errors kept on the job; error_count has the total
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMPORT_WORKERS, thread_name_prefix='import-job'
+        )
+    return _executor
+
+
+def enqueue(job):
+    """Run `job` in the worker pool after the current transaction commits."""
+    if settings.IMPORT_WORKERS:
+        transaction.on_commit(lambda: _pool().submit(_run_in_worker, job.pk))
+    else:
+        transaction.on_commit(lambda: run(job.pk))
+
+
+def _create_property(payload):
+    ser = PropertySerializer(data=payload)
+    if not ser.is_valid():
+        return None
+    ser.save()
+    return ser.data
+
+
+def _progress(job_id):
+    def on_progress(read, total):
+        ImportJob.objects.filter(pk=job_id).update(rows_processed=read, total_rows=total)
+    return on_progress
+
+
+def _import(job, on_progress):
+    with open(job.file.path, 'rb') as f:
+        if job.kind == 'units':
+            report = ingest_units(
+                f, job.property_id, job.property.name, upsert_units, on_progress=on_progress
+            )
+            result = {'created': report['created'], 'updated': report['updated']}
+        else:
+            report = ingest(f, _create_property, upsert_expenses, on_progress=on_progress)
+            result = {'properties': report['properties']}
+    return report, result
+
+
+def _run_in_worker(job_id):
+    # pool threads keep their own connections; drop them between jobs
+    close_old_connections()
+    try:
+        run(job_id)
+    finally:
+        close_old_connections()
+
+
+def run(job_id):
+    """Process one queued job, recording progress and the outcome on the row."""
+    try:
+        job = ImportJob.objects.select_related('property').get(pk=job_id, status='queued')
+    except ImportJob.DoesNotExist:
+        return
+    ImportJob.objects.filter(pk=job_id).update(status='running', started_at=timezone.now())
+    fields = {}
+    try:
+        report, result = _import(job, _progress(job_id))
+        fields = {
+            'status': 'done', 'result': result, 'rows_processed': report['rows'],
+            'error_count': len(report['errors']),
+            'errors': [list(e) for e in report['errors'][:MAX_ERRORS]],
+        }
+    except TemplateError as e:
+        fields = {'status': 'failed', 'message': str(e)}
+    except Exception as e:
+        logger.exception("Import job %s failed", job_id)
+        fields = {'status': 'failed', 'message': f"Unexpected error: {e}"}
+    finally:
+        job.file.delete(save=False)  # the parsed rows now live in the database
+        ImportJob.objects.filter(pk=job_id).update(finished_at=timezone.now(), file='', **fields)
@@ -0,0 +1,341 @@
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from itertools import count
+
+import django
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, F, Sum
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone as django_timezone
+
+from api.footage import refresh_footage
+from api.models import EXPENSE_CATEGORIES, Expense, Property
+from api.money import dollars
+from api.renderers import JSONRows, pa
+from api.rollups import rebuild
+from api.seed import benchmark_database, seed_portfolio
+from api.serializers import ExpenseSerializer
+from api.views import EXPENSE_JSON_FIELDS
+
+# the pages' DataFrame shaping lives with the Streamlit app
+sys.path.insert(0, str(settings.BASE_DIR / 'streamlit_app'))
+import frames  # noqa: E402
+from baselines import trailing_loop  # noqa: E402
+from display import PAGE_ROWS  # noqa: E402
+
+
+def _json(client, url, params=None):
+    """Every row of a cursor-paginated list, following `next` like utils_api."""
+    rows, params = [], {'page_size': 5000, **(params or {})}
+    while url:
+        page = client.get(url, params).json()
+        rows += page['results']
+        url, params = page['next'], None
+    return rows
+
+
+def _frontend_bytes(df):
+    """What st.dataframe ships to the browser for `df`: an Arrow IPC stream."""
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=settings.BASE_DIR, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def money_exactness():
+    """
+    Per-property category totals summed as integer cents vs. as float
+    dollars (what the old FloatField columns summed): how many totals the
+    float sums miss, and by how much.
+    """
+    exact = {f'{k}_cents': Sum(k) for k in EXPENSE_CATEGORIES}
+    floats = {f'{k}_float': Sum(F(k) / 100.0) for k in EXPENSE_CATEGORIES}
+    totals = mismatched = 0
+    worst = 0.0
+    for row in Expense.objects.values('property').annotate(**exact, **floats):
+        for k in EXPENSE_CATEGORIES:
+            error = abs(row[f'{k}_float'] - dollars(row[f'{k}_cents']))
+            totals += 1
+            mismatched += error > 0
+            worst = max(worst, error)
+    return {'totals': totals, 'float_mismatches': mismatched, 'float_max_error': worst}
+
+
+def measure(fn, repeat):
+    """
+    Time `fn` (returning the number of items it handled) `repeat` times,
+    then run it once more under query capture and tracemalloc, so neither
+    instrument skews the latency samples.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    median = statistics.median(samples)
+    return {
+        'median_ms': round(median, 3),
+        'p95_ms': round(sorted(samples)[max(0, round(0.95 * len(samples)) - 1)], 3),
+        'min_ms': round(min(samples), 3),
+        'items': items,
+        'items_per_s': round(items / median * 1000, 1) if median else None,
+        'queries': len(queries),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark suite: seed a throwaway database with N properties x M months "
+        "x U units, then measure latency, throughput, query counts and peak "
+        "memory for each viewset's list/create and the pandas shaping used by "
+        "the view_properties and property_list pages. Writes JSON results; "
+        "--compare prints the change against an earlier results file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--properties', type=int, default=200)
+        parser.add_argument('--months', type=int, default=60)
+        parser.add_argument('--units', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help='Results file (default: bench-<UTC timestamp>.json).')
+        parser.add_argument('--compare', help='Earlier results file to diff against.')
+        parser.add_argument('--only', default='', help='Run only cases whose name contains this.')
+
+    def handle(self, *args, **opts):
+        started = datetime.now(timezone.utc)
+        with benchmark_database():
+            start = time.perf_counter()
+            seed_portfolio(opts['properties'], opts['months'], opts['units'])
+            rebuild()
+            refresh_footage()
+            self.stdout.write(
+                f"seeded {Property.objects.count():,} properties, {Expense.objects.count():,} "
+                f"expense rows in {time.perf_counter() - start:.1f}s ({connection.vendor})"
+            )
+            results = []
+            for name, fn in self._cases(Client()).items():
+                if opts['only'] in name:
+                    results.append({'name': name, **measure(fn, opts['repeat'])})
+                    self.stdout.write(self._line(results[-1]))
+            exactness = money_exactness()
+            self.stdout.write(
+                f"money: {exactness['float_mismatches']:,} of {exactness['totals']:,} per-property "
+                f"totals differ when summed as floats (max error {exactness['float_max_error']:.3g} dollars); "
+                "integer-cent sums are exact"
+            )
+
+        report = {
+            'timestamp': started.isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'params': {k: opts[k] for k in ('properties', 'months', 'units', 'repeat')},
+            'results': results,
+            'money': exactness,
+        }
+        output = opts['output'] or f"bench-{started:%Y%m%dT%H%M%SZ}.json"
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"wrote {output}")
+        if opts['compare']:
+            self._compare(opts['compare'], results)
+
+    def _cases(self, client):
+        prop = Property.objects.order_by('pk').first()
+        fresh = count(1)
+        # rows the write cases add from here on are what an incremental refresh fetches
+        since = django_timezone.now().isoformat()
+
+        def create_property():
+            client.post('/api/properties/', {
+                'name': f'Bench {next(fresh)}', 'units': 10,
+                'property_type': 'Garden', 'location': 'Denver',
+            }, content_type='application/json')
+            return 1
+
+        def create_expense():
+            year, month = divmod(next(fresh), 12)
+            client.post('/api/expenses/', {
+                'property': prop.pk, 'year': 3000 + year, 'month': month + 1,
+                **{k: 100.0 for k in EXPENSE_CATEGORIES},
+            }, content_type='application/json')
+            return 1
+
+        def create_unit():
+            client.post('/api/units/', {
+                'property': prop.pk, 'unit_number': 100000 + next(fresh), 'square_footage': 700,
+            }, content_type='application/json')
+            return 1
+
+        def bulk_expenses():
+            base = next(fresh) * 1000
+            rows = [
+                {'property': prop.pk, 'year': 4000 + (base + i) // 12, 'month': (base + i) % 12 + 1,
+                 **{k: 100.0 for k in EXPENSE_CATEGORIES}}
+                for i in range(1000)
+            ]
+            client.post('/api/expenses/bulk/', rows, content_type='application/json')
+            return len(rows)
+
+        def columnar_frame():
+            if pa is None:
+                return len(pd.read_csv(io.BytesIO(client.get('/api/expenses/', {'format': 'csv'}).content)))
+            body = client.get('/api/expenses/', {'format': 'arrow'}).content
+            return len(pa.ipc.open_stream(body).read_pandas())
+
+        # inputs for the page transformations, fetched once like store.py does
+        prop_rows = _json(client, '/api/properties/')
+        props = frames.property_frame(prop_rows)
+        sums = pd.DataFrame(client.get('/api/expenses/trailing/', {'window': 12}).json())
+        raw_expenses = pd.DataFrame(_json(client, '/api/expenses/'))
+        expenses = frames.expense_frame(raw_expenses)
+        monthly = frames.merge_monthly(expenses, props)
+        one_prop = props[props['id'] == prop.pk]
+        one_sums = sums[sums['property'] == prop.pk]
+        one_monthly = monthly[monthly['property'] == prop.pk]
+        # a refresh that finds 1% of the expense months rewritten
+        changed = expenses.sample(frac=0.01, random_state=0).copy()
+        changed['payroll'] += 1
+        # one full page, serialized both ways without the request around it
+        page = list(Expense.objects.order_by('id')[:5000])
+        page_values = list(Expense.objects.order_by('id').values(*(n for n, _ in EXPENSE_JSON_FIELDS))[:5000])
+        # XLSX exports over EXPORT_XLSX_MAX_ROWS get a 400, so the workbook case
+        # exports the latest seeded months that fit under the cap
+        xlsx_params, rows = {'format': 'xlsx'}, 0
+        periods = Expense.objects.values('year', 'month').annotate(n=Count('id')).order_by('-year', '-month')
+        for period in periods:
+            if rows + period['n'] > settings.EXPORT_XLSX_MAX_ROWS:
+                break
+            rows += period['n']
+            xlsx_params['start'] = f"{period['year']}-{period['month']:02d}"
+            xlsx_params.setdefault('end', xlsx_params['start'])
+
+        def serialize_page():
+            JSONRenderer().render(ExpenseSerializer(page, many=True).data)
+            return len(page)
+
+        def store_load():
+            expenses_ = frames.expense_frame(raw_expenses)
+            return len(frames.merge_monthly(expenses_, frames.property_frame(prop_rows)))
+
+        def store_sync():
+            # store.PortfolioStore._sync for rewritten expense months
+            frames.upsert(expenses, changed)
+            return len(frames.patch_amounts(monthly, changed))
+
+        def changed_frame():
+            params = {'format': 'csv' if pa is None else 'arrow', 'modified_since': since}
+            body = client.get('/api/expenses/', params).content
+            if pa is None:
+                return len(pd.read_csv(io.BytesIO(body)))
+            return len(pa.ipc.open_stream(body).read_pandas())
+
+        def change_feed(params):
+            # consumed chunk by chunk like a syncing client, so peak memory is the server's
+            resp = client.get('/api/changes/', params)
+            return sum(chunk.count(b'"op"') for chunk in resp.streaming_content)
+
+        def export(params):
+            # consumed chunk by chunk like a downloading client, so peak memory is the server's;
+            # a refused export (e.g. the 400 for XLSX over the cap) is a plain Response, not streamed
+            resp = client.get('/api/export/', params)
+            if resp.status_code != 200:
+                raise CommandError(f"/api/export/ {params} returned {resp.status_code}: {resp.content[:200]!r}")
+            return sum(len(chunk) for chunk in resp.streaming_content)
+
+        def render_monthly(rows):
+            table = frames.monthly_view(monthly)
+            _frontend_bytes(table.iloc[:rows])
+            return len(table)
+
+        def format_page():
+            JSONRows(page_values, EXPENSE_JSON_FIELDS).render()
+            return len(page_values)
+
+        return {
+            'api.properties.list': lambda: len(_json(client, '/api/properties/')),
+            'api.properties.create': create_property,
+            'api.expenses.list': lambda: len(_json(client, '/api/expenses/')),
+            'api.expenses.list_columnar': columnar_frame,
+            'api.expenses.list_modified_since': changed_frame,
+            # the change feed: every row as a snapshot vs. the writes since setup
+            'api.changes.snapshot': lambda: change_feed({}),
+            'api.changes.since': lambda: change_feed({'since': since}),
+            # the bulk export (items are bytes): every month with its property's metadata as
+            # CSV; XLSX only for the latest months within EXPORT_XLSX_MAX_ROWS (see above)
+            'api.export.csv': lambda: export({'format': 'csv'}),
+            'api.export.xlsx': lambda: export(xlsx_params),
+            'api.expenses.create': create_expense,
+            'api.expenses.bulk': bulk_expenses,
+            'api.expenses.trailing': lambda: len(client.get('/api/expenses/trailing/', {'window': 12}).json()),
+            'api.expenses.page_serializer': serialize_page,
+            'api.expenses.page_fast_json': format_page,
+            'api.units.list': lambda: len(_json(client, '/api/units/')),
+            'api.units.create': create_unit,
+            'api.analytics.distribution': lambda: len(
+                client.get('/api/analytics/distribution/', {'category': 'taxes'}).json()['properties']
+            ),
+            # client-side T12 over the fetched monthly frame: old per-property loop vs one groupby pass
+            'pages.trailing_sums.iterrows_loop': lambda: len(trailing_loop(expenses, props, 12, 'unit')),
+            'pages.trailing_sums.groupby': lambda: len(frames.trailing_sums(expenses, props, 12, 'unit')),
+            'pages.view_properties.trailing': lambda: len(frames.trailing_summary(props, sums)),
+            'pages.view_properties.monthly': lambda: len(frames.monthly_view(monthly, 'unit')),
+            'pages.property_list.trailing': lambda: len(frames.trailing_summary(one_prop, one_sums)),
+            'pages.property_list.monthly': lambda: len(frames.monthly_view(one_monthly, 'unit')),
+            # store.py: typing and merging everything vs. folding in a 1% change set
+            'store.full_load': store_load,
+            'store.incremental_sync': store_sync,
+            # a monthly-view rerun: shape the frame and serialize what the browser receives,
+            # the whole table vs. the one page display.paged_table sends
+            **({
+                'pages.view_properties.render_all': lambda: render_monthly(None),
+                'pages.view_properties.render_page': lambda: render_monthly(PAGE_ROWS),
+            } if pa is not None else {}),
+        }
+
+    def _line(self, r):
+        return (
+            f"{r['name']:<34}{r['median_ms']:>10.1f} ms{r['p95_ms']:>10.1f} p95"
+            f"{r['items_per_s'] or 0:>12,.0f}/s{r['queries']:>6} q{r['peak_kib']:>10,.0f} KiB"
+        )
+
+    def _compare(self, path, results):
+        with open(path) as f:
+            before = {r['name']: r for r in json.load(f)['results']}
+        self.stdout.write(f"\n{'case':<34}{'before ms':>12}{'after ms':>12}{'change':>9}")
+        for r in results:
+            old = before.get(r['name'])
+            if not old:
+                continue
+            change = (r['median_ms'] - old['median_ms']) / old['median_ms'] * 100 if old['median_ms'] else 0
+            self.stdout.write(f"{r['name']:<34}{old['median_ms']:>12.1f}{r['median_ms']:>12.1f}{change:>+8.0f}%")
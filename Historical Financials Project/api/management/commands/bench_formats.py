@@ -0,0 +1,75 @@
+import io
+import json
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from api.models import Expense
+from api.renderers import COLUMNAR_FORMATS, pa
+from api.seed import benchmark_database, seed_portfolio
+
+MONTHS = 120
+
+
+def _read_json(client):
+    """Follow cursor pages like utils_api does; returns (bytes, parse seconds, frame)."""
+    url, size, rows, parse = '/api/expenses/?page_size=5000', 0, [], 0.0
+    while url:
+        body = client.get(url).content
+        size += len(body)
+        start = time.perf_counter()
+        page = json.loads(body)
+        rows += page['results']
+        parse += time.perf_counter() - start
+        url = page['next']
+    start = time.perf_counter()
+    frame = pd.DataFrame(rows)
+    return size, parse + time.perf_counter() - start, frame
+
+
+def _read_columnar(client, fmt):
+    body = client.get('/api/expenses/', {'format': fmt}).content
+    start = time.perf_counter()
+    if fmt == 'arrow':
+        frame = pa.ipc.open_stream(body).read_pandas()
+    elif fmt == 'parquet':
+        frame = pd.read_parquet(io.BytesIO(body))
+    else:
+        frame = pd.read_csv(io.BytesIO(body))
+    return len(body), time.perf_counter() - start, frame
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare /api/expenses/ as paginated JSON against the CSV, Arrow and "
+        "Parquet renderings: payload size, end-to-end time and client parse "
+        "time into a DataFrame, on a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma-separated expense row counts.')
+
+    def handle(self, *args, **opts):
+        sizes = sorted(int(s) for s in opts['sizes'].split(','))
+        formats = ['json'] + sorted(COLUMNAR_FORMATS)
+        client = Client()
+        self.stdout.write(f"{'rows':>9} {'format':<8}{'MB':>9}{'total s':>10}{'parse s':>10}")
+        with benchmark_database():
+            for n in sizes:
+                # grow the portfolio to n rows (120 months per property)
+                have = Expense.objects.count()
+                if n > have:
+                    seed_portfolio((n - have) // MONTHS, MONTHS, seed=n)
+                for fmt in formats:
+                    start = time.perf_counter()
+                    if fmt == 'json':
+                        size, parse, frame = _read_json(client)
+                    else:
+                        size, parse, frame = _read_columnar(client, fmt)
+                    total = time.perf_counter() - start
+                    self.stdout.write(
+                        f"{len(frame):>9,} {fmt:<8}{size / 1e6:>9.2f}{total:>10.2f}{parse:>10.2f}"
+                    )
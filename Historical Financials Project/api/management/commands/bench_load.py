@@ -0,0 +1,201 @@
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import count
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Expense, Property
+
+from .bench_api import _git_commit
+
+# the same reads through the DRF viewsets (WSGI) and api.async_views (ASGI)
+READS = ['properties/', 'expenses/?page_size=500', 'expenses/trailing/?window=12']
+# name: (server module, its arguments, API prefix); one process each: gunicorn
+# with a threaded worker for WSGI, uvicorn's event loop for ASGI
+SERVERS = {
+    'wsgi': ('gunicorn', [
+        'myapp.wsgi:application', '--worker-class', 'gthread', '--workers', '1',
+        '--threads', '{threads}', '--bind', '127.0.0.1:{port}', '--log-level', 'warning',
+    ], '/api/'),
+    'asgi': ('uvicorn', [
+        'myapp.asgi:application', '--port', '{port}', '--log-level', 'warning', '--no-access-log',
+    ], '/api/async/'),
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url, timeout=30):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            conn.request('GET', '/api/expense-categories/')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"server at {url} did not come up in {timeout}s")
+
+
+def _worker(base, paths, deadline, cold, nonce, samples, errors):
+    """One keep-alive client: GET `paths` round-robin until `deadline`."""
+    parts = urlsplit(base)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    i = 0
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        if cold:
+            # a fresh URL per request misses the response cache, so every read hits the database
+            path += ('&' if '?' in path else '?') + f'_n={next(nonce)}'
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+            ok = False
+        elapsed = time.perf_counter() - start
+        (samples if ok else errors).append(elapsed)
+    conn.close()
+
+
+def run_load(base, paths, concurrency, duration, cold=True):
+    """
+    `concurrency` client threads hammer `base` for `duration` seconds.
+    Returns requests/s, latency percentiles (ms) and the error count.
+    """
+    samples, errors, nonce = [], [], count()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(base, paths, deadline, cold, nonce, samples, errors))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    ordered = sorted(samples) or [0.0]
+
+    def pct(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': len(errors),
+        'rps': round(len(samples) / wall, 1),
+        'p50_ms': pct(0.5),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test: start the API under gunicorn as WSGI (the DRF viewsets in "
+        "one threaded worker) and under uvicorn as ASGI (the async views under "
+        "/api/async/), on the configured database, then drive the same reads "
+        "from N concurrent keep-alive clients and report requests/s and "
+        "p50/p95/p99 latency per server and concurrency level. Seed the "
+        "database first. Needs gunicorn and uvicorn (requirements.txt; "
+        "gunicorn does not run on Windows); --target NAME=URL measures already "
+        "running servers instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,8,32,64',
+                            help='Comma-separated numbers of concurrent clients.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per level.')
+        parser.add_argument('--threads', type=int, default=32,
+                            help="Threads of the WSGI server's worker.")
+        parser.add_argument('--warm', action='store_true',
+                            help='Repeat identical URLs, so reads may be served by the response cache.')
+        parser.add_argument('--target', action='append', default=[],
+                            help="NAME=URL of a running server, NAME 'wsgi' or 'asgi' (repeatable).")
+        parser.add_argument('--output', help='Results file (default: load-<UTC timestamp>.json).')
+
+    def handle(self, *args, **opts):
+        levels = [int(c) for c in opts['concurrency'].split(',') if c]
+        props, expenses = Property.objects.count(), Expense.objects.count()
+        if not expenses:
+            self.stderr.write("the database has no expenses; results will only measure overhead")
+        self.stdout.write(f"{props:,} properties, {expenses:,} expense rows")
+
+        started = datetime.now(timezone.utc)
+        servers, targets = [], {}
+        try:
+            if opts['target']:
+                for spec in opts['target']:
+                    name, _, url = spec.partition('=')
+                    if name not in SERVERS or not url:
+                        raise CommandError(f"--target expects wsgi=URL or asgi=URL, got {spec!r}")
+                    targets[name] = url.rstrip('/')
+            else:
+                missing = [module for module, _, _ in SERVERS.values() if not importlib.util.find_spec(module)]
+                if missing:
+                    raise CommandError(f"install {' and '.join(missing)}, or measure running servers with --target")
+                for name, (module, args, _) in SERVERS.items():
+                    port = _free_port()
+                    args = [a.format(port=port, threads=opts['threads']) for a in args]
+                    servers.append(subprocess.Popen(
+                        [sys.executable, '-m', module, *args],
+                        cwd=settings.BASE_DIR, env={**os.environ, 'IMPORT_WORKERS': '0'},
+                    ))
+                    targets[name] = f'http://127.0.0.1:{port}'
+            for url in targets.values():
+                _wait_ready(url)
+
+            results = []
+            for name, base in targets.items():
+                paths = [SERVERS[name][2] + p for p in READS]
+                for level in levels:
+                    r = {'server': name, **run_load(base, paths, level, opts['duration'], not opts['warm'])}
+                    results.append(r)
+                    self.stdout.write(
+                        f"{name:<6}{level:>5} clients{r['rps']:>10,.1f} req/s"
+                        f"{r['p50_ms']:>10.1f} p50{r['p99_ms']:>10.1f} p99 ms{r['errors']:>6} errors"
+                    )
+        finally:
+            for proc in servers:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+        report = {
+            'timestamp': started.isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'reads': READS,
+            'servers': {name: SERVERS[name][0] for name in targets} if servers else targets,
+            'wsgi_threads': opts['threads'],
+            'cold': not opts['warm'],
+            'duration_s': opts['duration'],
+            'data': {'properties': props, 'expenses': expenses},
+            'results': results,
+        }
+        output = opts['output'] or f"load-{started:%Y%m%dT%H%M%SZ}.json"
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"wrote {output}")
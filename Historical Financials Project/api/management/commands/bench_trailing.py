@@ -0,0 +1,94 @@
+import importlib
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.aggregates import trailing_totals
+from api.models import Property, Expense
+from api.seed import benchmark_database, seed_portfolio
+
+covering = importlib.import_module('api.migrations.0004_expense_period_constraint')
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway copy of the default database with a synthetic portfolio "
+        "and time trailing-window lookups with and without the Expense period "
+        "constraint / covering index and the Property filter index. Point "
+        "DATABASES['default'] at SQLite or Postgres to compare backends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--properties', type=int, default=25000)
+        parser.add_argument('--months', type=int, default=120)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Reuse (and keep) an already seeded benchmark database.')
+
+    def handle(self, *args, **opts):
+        with benchmark_database(opts['keepdb']):
+            if not Expense.objects.exists():
+                start = time.perf_counter()
+                seed_portfolio(opts['properties'], opts['months'])
+                self.stdout.write(
+                    f"seeded {Expense.objects.count():,} expense rows "
+                    f"in {time.perf_counter() - start:.1f}s ({connection.vendor})"
+                )
+            self._run(opts['repeat'])
+
+    def _queries(self):
+        prop = Property.objects.order_by('pk').values_list('pk', 'property_type', 'location')[0]
+        return {
+            'latest 12 months, one property': lambda: list(
+                Expense.objects.filter(property=prop[0]).order_by('-year', '-month')[:12]
+            ),
+            'T12 totals, one property': lambda: list(
+                trailing_totals(12, Expense.objects.filter(property=prop[0]))
+            ),
+            'T3 totals, 100 properties': lambda: list(
+                trailing_totals(3, Expense.objects.filter(property__in=range(prop[0], prop[0] + 100)))
+            ),
+            'T12 totals, all properties': lambda: list(trailing_totals(12)),
+            'property filter (type, location)': lambda: list(
+                Property.objects.filter(property_type=prop[1], location=prop[2])
+            ),
+        }
+
+    def _time(self, repeat):
+        timings = {}
+        for label, query in self._queries().items():
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query()
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[label] = statistics.median(samples)
+        return timings
+
+    def _set_indexes(self, enabled):
+        constraint = Expense._meta.constraints[0]
+        index = Property._meta.indexes[0]
+        with connection.schema_editor() as editor:
+            if enabled:
+                editor.add_constraint(Expense, constraint)
+                editor.add_index(Property, index)
+                covering.create_covering_index(None, editor)
+            else:
+                covering.drop_covering_index(None, editor)
+                editor.remove_index(Property, index)
+                editor.remove_constraint(Expense, constraint)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _run(self, repeat):
+        self._set_indexes(False)
+        before = self._time(repeat)
+        self._set_indexes(True)
+        after = self._time(repeat)
+
+        self.stdout.write(f"\n{'query':<36}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+        for label in before:
+            b, a = before[label], after[label]
+            self.stdout.write(f"{label:<36}{b:>12.1f}{a:>12.1f}{b / a if a else 0:>9.1f}x")
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete tombstones older than TOMBSTONE_RETENTION. /api/changes/ answers "
+        "older cursors with 410 Gone, so their clients reload in full instead."
+    )
+
+    def handle(self, *args, **opts):
+        count, _ = Tombstone.objects.filter(
+            deleted_at__lt=timezone.now() - settings.TOMBSTONE_RETENTION
+        ).delete()
+        self.stdout.write(f"pruned {count:,} tombstones")
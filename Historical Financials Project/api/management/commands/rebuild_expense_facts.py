@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.facts import normalized, rebuild_facts
+from api.versioning import touch
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate every ExpenseFact row (normalized expense storage) from the "
+        "expense table in one bulk pass. Run after setting EXPENSE_STORAGE=normalized."
+    )
+
+    def handle(self, *args, **opts):
+        if not normalized():
+            self.stderr.write("EXPENSE_STORAGE is not 'normalized'; facts will not be kept up to date.")
+        start = time.perf_counter()
+        count = rebuild_facts()
+        touch('expenses')
+        self.stdout.write(f"rebuilt {count:,} expense fact rows in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.rollups import rebuild
+from api.versioning import touch
+
+
+class Command(BaseCommand):
+    help = "Recreate every ExpenseRollup row from the expense table in one bulk pass."
+
+    def handle(self, *args, **opts):
+        start = time.perf_counter()
+        count = rebuild()
+        touch('expenses')
+        self.stdout.write(f"rebuilt {count:,} rollup rows in {time.perf_counter() - start:.1f}s")
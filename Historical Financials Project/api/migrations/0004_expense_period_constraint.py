@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:04
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+CATEGORIES = [
+    'payroll', 'marketing', 'admin', 'maintenance',
+    'turnover', 'utilities', 'taxes', 'insurance', 'management_fees',
+]
+
+
+def drop_duplicate_periods(apps, schema_editor):
+    """Keep the most recently uploaded row for each (property, year, month)."""
+    Expense = apps.get_model('api', 'Expense')
+    dupes = (
+        Expense.objects.values('property', 'year', 'month')
+        .annotate(n=Count('id'), keep=Max('id'))
+        .filter(n__gt=1)
+    )
+    for d in dupes:
+        Expense.objects.filter(
+            property=d['property'], year=d['year'], month=d['month']
+        ).exclude(id=d['keep']).delete()
+
+
+def create_covering_index(apps, schema_editor):
+    # INCLUDE is Postgres-only; elsewhere the unique constraint's index is used
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX expense_period_covering_idx ON api_expense '
+        '(property_id, year DESC, month DESC) INCLUDE (%s)' % ', '.join(CATEGORIES)
+    )
+
+
+def drop_covering_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS expense_period_covering_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_rename_unit_count_property_units_alter_unit_property'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['property_type', 'location'], name='property_type_location_idx'),
+        ),
+        migrations.RunPython(drop_duplicate_periods, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='expense',
+            constraint=models.UniqueConstraint(fields=('property', 'year', 'month'), name='expense_unique_period'),
+        ),
+        migrations.RunPython(create_covering_index, drop_covering_index),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_rollups(apps, schema_editor):
+    from api.rollups import rebuild
+    rebuild(apps.get_model('api', 'Expense'), apps.get_model('api', 'ExpenseRollup'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_expense_period_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.IntegerField()),
+                ('year', models.IntegerField()),
+                ('is_latest', models.BooleanField(default=False)),
+                ('total', models.FloatField()),
+                ('t3_months', models.IntegerField()),
+                ('t3_first', models.IntegerField()),
+                ('t3_payroll', models.FloatField()),
+                ('t3_marketing', models.FloatField()),
+                ('t3_admin', models.FloatField()),
+                ('t3_maintenance', models.FloatField()),
+                ('t3_turnover', models.FloatField()),
+                ('t3_utilities', models.FloatField()),
+                ('t3_taxes', models.FloatField()),
+                ('t3_insurance', models.FloatField()),
+                ('t3_management_fees', models.FloatField()),
+                ('t3_total', models.FloatField()),
+                ('t12_months', models.IntegerField()),
+                ('t12_first', models.IntegerField()),
+                ('t12_payroll', models.FloatField()),
+                ('t12_marketing', models.FloatField()),
+                ('t12_admin', models.FloatField()),
+                ('t12_maintenance', models.FloatField()),
+                ('t12_turnover', models.FloatField()),
+                ('t12_utilities', models.FloatField()),
+                ('t12_taxes', models.FloatField()),
+                ('t12_insurance', models.FloatField()),
+                ('t12_management_fees', models.FloatField()),
+                ('t12_total', models.FloatField()),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='api.property')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['is_latest', 'property'], name='rollup_latest_idx')],
+                'constraints': [models.UniqueConstraint(fields=('property', 'year', 'month'), name='rollup_unique_period')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
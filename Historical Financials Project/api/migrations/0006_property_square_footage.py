@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:16
+
+from django.db import migrations, models
+
+
+def fill_footage(apps, schema_editor):
+    from api.footage import refresh_footage
+    refresh_footage(property_model=apps.get_model('api', 'Property'), unit_model=apps.get_model('api', 'Unit'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_expense_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='avg_sqft',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='total_sqft',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(fill_footage, migrations.RunPython.noop),
+    ]
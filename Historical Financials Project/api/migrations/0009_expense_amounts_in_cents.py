@@ -0,0 +1,193 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:30
+
+import api.models
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Round
+
+CATEGORIES = [
+    'payroll', 'marketing', 'admin', 'maintenance',
+    'turnover', 'utilities', 'taxes', 'insurance', 'management_fees',
+]
+ROLLUP_COLUMNS = ['total'] + [f't{w}_{k}' for w in (3, 12) for k in CATEGORIES + ['total']]
+
+
+def dollars_to_cents(apps, schema_editor):
+    # still float columns here; AlterField then casts the whole numbers to BIGINT
+    Expense = apps.get_model('api', 'Expense')
+    Expense.objects.update(**{k: Round(F(k) * 100) for k in CATEGORIES})
+
+
+def cents_to_dollars(apps, schema_editor):
+    Expense = apps.get_model('api', 'Expense')
+    ExpenseRollup = apps.get_model('api', 'ExpenseRollup')
+    Expense.objects.update(**{k: F(k) / 100.0 for k in CATEGORIES})
+    ExpenseRollup.objects.update(**{k: F(k) / 100.0 for k in ROLLUP_COLUMNS})
+
+
+def build_rollups(apps, schema_editor):
+    # exact integer sums, rather than scaling the old float sums
+    from api.rollups import rebuild
+    rebuild(apps.get_model('api', 'Expense'), apps.get_model('api', 'ExpenseRollup'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_resource_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(dollars_to_cents, cents_to_dollars),
+        migrations.AlterField(
+            model_name='expense',
+            name='admin',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='insurance',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='maintenance',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='management_fees',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='marketing',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='payroll',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='taxes',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='turnover',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='utilities',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t12_admin',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t12_insurance',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t12_maintenance',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t12_management_fees',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t12_marketing',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t12_payroll',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t12_taxes',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t12_total',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t12_turnover',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t12_utilities',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t3_admin',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t3_insurance',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t3_maintenance',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t3_management_fees',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t3_marketing',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t3_payroll',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t3_taxes',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t3_total',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t3_turnover',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='t3_utilities',
+            field=api.models.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name='expenserollup',
+            name='total',
+            field=api.models.CentsField(),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:33
+
+import api.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_categories(apps, schema_editor):
+    ExpenseCategory = apps.get_model('api', 'ExpenseCategory')
+    keys = [
+        'payroll', 'marketing', 'admin', 'maintenance',
+        'turnover', 'utilities', 'taxes', 'insurance', 'management_fees',
+    ]
+    ExpenseCategory.objects.bulk_create([
+        ExpenseCategory(key=k, label=k.replace('_', ' ').title(), position=i) for i, k in enumerate(keys)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_expense_amounts_in_cents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.SlugField(unique=True)),
+                ('label', models.CharField(max_length=100)),
+                ('position', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'expense categories',
+                'ordering': ['position', 'key'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExpenseFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('amount', api.models.CentsField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='facts', to='api.expensecategory')),
+                ('expense', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facts', to='api.expense')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expense_facts', to='api.property')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'property', 'year', 'month'], name='fact_category_scan_idx')],
+                'constraints': [models.UniqueConstraint(fields=('expense', 'category'), name='fact_unique_category')],
+            },
+        ),
+        migrations.RunPython(create_categories, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,34 @@
 from django.db import models
+from django.utils import timezone
+
+EXPENSE_CATEGORIES = [
+    'payroll', 'marketing', 'admin', 'maintenance',
+    'turnover', 'utilities', 'taxes', 'insurance', 'management_fees',
+]
+
+class CentsField(models.BigIntegerField):
+    """
+    A money amount stored as integer cents, so sums in the database are
+    exact. The API still speaks dollars (see api.money).
+    """
 
 class Property(models.Model):
     name = models.CharField(max_length=200)
     units = models.IntegerField()
     property_type = models.CharField(max_length=50)
     location = models.CharField(max_length=200)
+    # maintained from unit_entries by api.footage; null avg_sqft means no units
+    total_sqft = models.FloatField(default=0)
+    avg_sqft = models.FloatField(null=True, blank=True)
+    # updated_at is set on every write, footage refreshes included;
+    # ?modified_since= and /api/changes/ read them
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['property_type', 'location'], name='property_type_location_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -15,15 +39,66 @@ class Expense(models.Model):
     )
     month = models.IntegerField()
     year = models.IntegerField()
-    payroll = models.FloatField()
-    marketing = models.FloatField()
-    admin = models.FloatField()
-    maintenance = models.FloatField()
-    turnover = models.FloatField()
-    utilities = models.FloatField()
-    taxes = models.FloatField()
-    insurance = models.FloatField()
-    management_fees = models.FloatField()
+    payroll = CentsField()
+    marketing = CentsField()
+    admin = CentsField()
+    maintenance = CentsField()
+    turnover = CentsField()
+    utilities = CentsField()
+    taxes = CentsField()
+    insurance = CentsField()
+    management_fees = CentsField()
+    # updated_at is set on every write, bulk upserts included;
+    # ?modified_since= and /api/changes/ read them
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # also the lookup index for "latest N months of a property";
+        # Postgres additionally gets a covering copy (see migration 0004)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property', 'year', 'month'], name='expense_unique_period'
+            ),
+        ]
+
+class ExpenseCategory(models.Model):
+    """
+    The expense category dimension: one row per key in EXPENSE_CATEGORIES,
+    in display order. ExpenseFact rows reference it.
+    """
+    key = models.SlugField(max_length=50, unique=True)
+    label = models.CharField(max_length=100)
+    position = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['position', 'key']
+        verbose_name_plural = 'expense categories'
+
+    def __str__(self):
+        return self.label
+
+class ExpenseFact(models.Model):
+    """
+    One category amount of one expense month: the narrow copy of an
+    Expense row kept by api.facts when settings.EXPENSE_STORAGE is
+    'normalized'. Property and period are repeated from the expense so
+    one-category scans never touch the wide table.
+    """
+    expense = models.ForeignKey(Expense, on_delete=models.CASCADE, related_name='facts')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='expense_facts')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    category = models.ForeignKey(ExpenseCategory, on_delete=models.PROTECT, related_name='facts')
+    amount = CentsField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['expense', 'category'], name='fact_unique_category'),
+        ]
+        indexes = [
+            models.Index(fields=['category', 'property', 'year', 'month'], name='fact_category_scan_idx'),
+        ]
 
 class Unit(models.Model):
     property = models.ForeignKey(
@@ -33,9 +108,132 @@ class Unit(models.Model):
     )
     unit_number    = models.IntegerField()
     square_footage = models.FloatField()
+    created_at     = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at     = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ('property', 'unit_number')
 
     def __str__(self):
-        return f"{self.property.name} – Unit {self.unit_number}"
\ No newline at end of file
+        return f"{self.property.name} – Unit {self.unit_number}"
+
+class ExpenseRollup(models.Model):
+    """
+    One row per property-month, maintained by api.rollups: the month's grand
+    total plus category sums over the trailing 3 and 12 expense months that
+    end at this month. `is_latest` marks each property's newest month, so
+    current T3/T12 figures are one indexed row per property.
+    """
+    property = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name='rollups'
+    )
+    month = models.IntegerField()
+    year = models.IntegerField()
+    is_latest = models.BooleanField(default=False)
+    total = CentsField()
+
+    t3_months = models.IntegerField()
+    t3_first = models.IntegerField()  # period key (year * 12 + month - 1)
+    t3_payroll = CentsField()
+    t3_marketing = CentsField()
+    t3_admin = CentsField()
+    t3_maintenance = CentsField()
+    t3_turnover = CentsField()
+    t3_utilities = CentsField()
+    t3_taxes = CentsField()
+    t3_insurance = CentsField()
+    t3_management_fees = CentsField()
+    t3_total = CentsField()
+
+    t12_months = models.IntegerField()
+    t12_first = models.IntegerField()
+    t12_payroll = CentsField()
+    t12_marketing = CentsField()
+    t12_admin = CentsField()
+    t12_maintenance = CentsField()
+    t12_turnover = CentsField()
+    t12_utilities = CentsField()
+    t12_taxes = CentsField()
+    t12_insurance = CentsField()
+    t12_management_fees = CentsField()
+    t12_total = CentsField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property', 'year', 'month'], name='rollup_unique_period'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['is_latest', 'property'], name='rollup_latest_idx'),
+        ]
+
+class ResourceVersion(models.Model):
+    """
+    Write generation of one API resource ('properties', 'expenses',
+    'units'), bumped by api.versioning after every committed write. Read
+    endpoints derive ETag / Last-Modified and response cache keys from it.
+    """
+    resource = models.CharField(max_length=50, unique=True)
+    generation = models.BigIntegerField(default=0)
+    modified_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.resource} v{self.generation}"
+
+class Tombstone(models.Model):
+    """
+    A deleted Property, Expense or Unit row, recorded by api.signals (cascades
+    included) so /api/changes/ can report the deletion. Pruned after
+    settings.TOMBSTONE_RETENTION by `manage.py prune_tombstones`.
+    """
+    resource = models.CharField(max_length=50)  # as in ResourceVersion
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'deleted_at'], name='tombstone_resource_time_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resource} #{self.object_id} deleted"
+
+class ImportJob(models.Model):
+    """
+    A spreadsheet upload parsed and written by api.jobs in a background
+    worker. Progress fields are updated after every written chunk so
+    clients can poll the job instead of holding a request open.
+    """
+    KIND_CHOICES = [('expenses', 'Expenses'), ('units', 'Units')]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    file = models.FileField(upload_to='imports/', blank=True)
+    filename = models.CharField(max_length=255)
+    property = models.ForeignKey(  # target of a unit import
+        Property, on_delete=models.CASCADE, null=True, blank=True, related_name='import_jobs'
+    )
+    total_rows = models.IntegerField(null=True, blank=True)
+    rows_processed = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list)  # first MAX_ERRORS (row, message) pairs
+    result = models.JSONField(default=dict)
+    message = models.TextField(blank=True)   # why a failed job failed
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def rows_per_second(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        seconds = (end - self.started_at).total_seconds()
+        return self.rows_processed / seconds if seconds > 0 else None
+
+    def __str__(self):
+        return f"{self.kind} import {self.filename} ({self.status})"
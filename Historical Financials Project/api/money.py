@@ -0,0 +1,41 @@
+"""
+Money conversions. Amounts are stored as integer cents (models.CentsField)
+and summed as integers in the database; they cross the API as dollar
+numbers, converted only at the edges.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+CENTS = 100
+# largest amount whose dollar value still round-trips through a double
+MAX_CENTS = 2 ** 53
+
+
+def to_cents(value):
+    """
+    Dollars (number or numeric string) to integer cents, rounding half up.
+    Parsed through Decimal so 0.1 + 0.2 style float noise never leaks in.
+    Raises ValueError for non-numeric, non-finite or out-of-range input.
+    """
+    if isinstance(value, bool):
+        raise ValueError(value)
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(value) from None
+    if not amount.is_finite() or abs(amount) * CENTS > MAX_CENTS:
+        raise ValueError(value)
+    return int((amount * CENTS).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def dollars(cents):
+    """
+    Cents (int, or float for normalized figures) to a dollar float. The
+    division is correctly rounded, so integer cents print back exactly.
+    """
+    return None if cents is None else cents / CENTS
+
+
+def format_cents(cents):
+    """Integer cents as a dollar number literal ('-12.05'), with no float in between."""
+    whole, frac = divmod(abs(cents), CENTS)
+    return ('-%d.%02d' if cents < 0 else '%d.%02d') % (whole, frac)
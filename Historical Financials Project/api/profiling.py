@@ -0,0 +1,173 @@
+"""
+Opt-in request instrumentation (settings.API_PROFILING).
+
+ProfilingMiddleware records, per viewset action: wall time, SQL query count
+and time, render (serialization) time and response bytes. Each response
+carries them in a Server-Timing header; totals are served in Prometheus
+text format by metrics_view. A PROFILING_SAMPLE_RATE fraction of requests
+run under cProfile, and those slower than PROFILING_SLOW_MS are dumped to
+PROFILING_DIR as .prof files (open with pstats or snakeviz). Only one
+request per process is profiled at a time (Python 3.12+ refuses a second
+active profiler); samples drawn while one runs are simply not profiled.
+"""
+import cProfile
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+
+# Upper bounds (seconds) of the request duration histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_profiler_lock = threading.Lock()
+_series = defaultdict(lambda: {
+    'count': 0, 'seconds': 0.0, 'queries': 0, 'db_seconds': 0.0,
+    'render_seconds': 0.0, 'bytes': 0, 'buckets': [0] * len(BUCKETS),
+})
+
+
+class _QueryTimer:
+    """connection.execute_wrapper that counts and times every query."""
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def _view_label(view_func):
+    """The viewset class name for DRF views, else the view function's name."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown')
+    return cls.__name__
+
+
+def _record(key, wall, queries, render, size):
+    with _lock:
+        s = _series[key]
+        s['count'] += 1
+        s['seconds'] += wall
+        s['queries'] += queries.count
+        s['db_seconds'] += queries.seconds
+        s['render_seconds'] += render
+        s['bytes'] += size
+        for i, bound in enumerate(BUCKETS):
+            if wall <= bound:
+                s['buckets'][i] += 1
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        label = _view_label(view_func)
+        actions = getattr(view_func, 'actions', None) or {}
+        action = actions.get(request.method.lower())
+        request._profiling_view = f'{label}.{action}' if action else label
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; time that separately
+        request._profiling_render = [time.perf_counter(), None]
+
+        def rendered(response):
+            request._profiling_render[1] = time.perf_counter()
+        response.add_post_render_callback(rendered)
+        return response
+
+    def __call__(self, request):
+        queries = _QueryTimer()
+        profiler = None
+        if random.random() < settings.PROFILING_SAMPLE_RATE and _profiler_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(queries):
+                if profiler:
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    response = self.get_response(request)
+        finally:
+            if profiler:
+                _profiler_lock.release()
+        wall = time.perf_counter() - start
+
+        render_start, render_end = getattr(request, '_profiling_render', (None, None))
+        render = render_end - render_start if render_end else 0.0
+        size = 0 if response.streaming else len(response.content)
+        view = getattr(request, '_profiling_view', 'unresolved')
+        _record((view, request.method, response.status_code), wall, queries, render, size)
+
+        response['Server-Timing'] = ', '.join([
+            f'app;dur={wall * 1000:.1f}',
+            f'db;dur={queries.seconds * 1000:.1f};desc="{queries.count} queries"',
+            f'render;dur={render * 1000:.1f}',
+        ])
+        if profiler and wall * 1000 >= settings.PROFILING_SLOW_MS:
+            self._dump(profiler, view, wall)
+        return response
+
+    def _dump(self, profiler, view, wall):
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        profiler.dump_stats(directory / f'{stamp}-{view}-{wall * 1000:.0f}ms.prof')
+
+
+def _metric_lines(name, kind, help_text, values):
+    yield f'# HELP {name} {help_text}'
+    yield f'# TYPE {name} {kind}'
+    yield from values
+
+
+def metrics_view(request):
+    """Totals per (view, method, status) in the Prometheus text exposition format."""
+    with _lock:
+        series = {k: {**v, 'buckets': list(v['buckets'])} for k, v in _series.items()}
+
+    def labels(key, **extra):
+        view, method, status = key
+        pairs = {'view': view, 'method': method, 'status': status, **extra}
+        return '{' + ','.join(f'{k}="{v}"' for k, v in pairs.items()) + '}'
+
+    def counter(field):
+        return [f'{labels(k)} {v[field]}' for k, v in series.items()]
+
+    lines = []
+    histogram = []
+    for key, v in series.items():
+        for bound, n in zip(BUCKETS, v['buckets']):
+            histogram.append(f'api_request_duration_seconds_bucket{labels(key, le=bound)} {n}')
+        histogram.append(f'api_request_duration_seconds_bucket{labels(key, le="+Inf")} {v["count"]}')
+        histogram.append(f'api_request_duration_seconds_sum{labels(key)} {v["seconds"]}')
+        histogram.append(f'api_request_duration_seconds_count{labels(key)} {v["count"]}')
+    lines += _metric_lines('api_request_duration_seconds', 'histogram',
+                           'Wall time per request.', histogram)
+    for name, field, help_text in (
+        ('api_db_queries_total', 'queries', 'SQL queries executed.'),
+        ('api_db_seconds_total', 'db_seconds', 'Time spent executing SQL.'),
+        ('api_render_seconds_total', 'render_seconds', 'Time spent rendering response bodies.'),
+        ('api_response_bytes_total', 'bytes', 'Response body bytes (streaming responses excluded).'),
+    ):
+        lines += _metric_lines(name, 'counter', help_text,
+                               [f'{name}{line}' for line in counter(field)])
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4')
+
+
+def reset_metrics():
+    with _lock:
+        _series.clear()
@@ -0,0 +1,127 @@
+import threading
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Q
+
+from .aggregates import TRAILING_WINDOWS, period_key
+from .models import EXPENSE_CATEGORIES, Expense, ExpenseRollup
+from .versioning import touch
+
+BATCH_SIZE = 2000
+_state = threading.local()
+
+
+def _since(key):
+    year, month = divmod(key, 12)
+    return Q(year__gt=year) | Q(year=year, month__gte=month + 1)
+
+
+def _rollups(rollup_model, property_id, rows, skip=0):
+    """
+    Build rollup instances for `rows` (period-ordered (year, month, *categories)
+    tuples of one property), skipping the first `skip` rows, which are only
+    there to fill the trailing windows.
+    """
+    out = []
+    for i in range(skip, len(rows)):
+        year, month, *amounts = rows[i]
+        fields = {'total': sum(amounts)}
+        for w in TRAILING_WINDOWS:
+            window = rows[max(0, i - w + 1):i + 1]
+            sums = [sum(r[2 + c] for r in window) for c in range(len(EXPENSE_CATEGORIES))]
+            fields.update({f't{w}_{k}': v for k, v in zip(EXPENSE_CATEGORIES, sums)})
+            fields[f't{w}_total'] = sum(sums)
+            fields[f't{w}_months'] = len(window)
+            fields[f't{w}_first'] = period_key(window[0][0], window[0][1])
+        out.append(rollup_model(property_id=property_id, year=year, month=month, **fields))
+    return out
+
+
+def _mark_latest(rollup_model, property_id):
+    rollups = rollup_model.objects.filter(property_id=property_id)
+    latest = rollups.order_by('-year', '-month').values_list('pk', flat=True).first()
+    rollups.filter(is_latest=True).exclude(pk=latest).update(is_latest=False)
+    if latest is not None:
+        rollups.filter(pk=latest).update(is_latest=True)
+
+
+def refresh_property(property_id, since=None):
+    """
+    Recompute the rollups of one property from period key `since` onward
+    (everything when None). Earlier rows are read only to fill the windows,
+    so the cost is proportional to the months at or after `since`.
+    """
+    columns = ['year', 'month'] + EXPENSE_CATEGORIES
+    expenses = Expense.objects.filter(property_id=property_id)
+    rollups = ExpenseRollup.objects.filter(property_id=property_id)
+    lead = []
+    if since is not None:
+        lead = list(
+            expenses.exclude(_since(since)).order_by('-year', '-month')
+            .values_list(*columns)[:max(TRAILING_WINDOWS) - 1]
+        )[::-1]
+        expenses = expenses.filter(_since(since))
+        rollups = rollups.filter(_since(since))
+    rows = lead + list(expenses.order_by('year', 'month').values_list(*columns))
+
+    with transaction.atomic():
+        rollups.delete()
+        ExpenseRollup.objects.bulk_create(
+            _rollups(ExpenseRollup, property_id, rows, skip=len(lead)), batch_size=BATCH_SIZE
+        )
+        _mark_latest(ExpenseRollup, property_id)
+        # trailing responses cached between the expense write and this refresh are stale
+        touch('expenses')
+
+
+def rebuild(expense_model=Expense, rollup_model=ExpenseRollup):
+    """
+    Recreate every rollup in one streaming pass over the expense table.
+    Takes the models as arguments so migrations can pass historical ones.
+    """
+    columns = ['property_id', 'year', 'month'] + EXPENSE_CATEGORIES
+    rows = (
+        expense_model.objects.order_by('property_id', 'year', 'month')
+        .values_list(*columns).iterator(chunk_size=BATCH_SIZE)
+    )
+    count, batch = 0, []
+    with transaction.atomic():
+        rollup_model.objects.all().delete()
+        for property_id, group in groupby(rows, key=lambda r: r[0]):
+            built = _rollups(rollup_model, property_id, [r[1:] for r in group])
+            built[-1].is_latest = True
+            batch += built
+            if len(batch) >= BATCH_SIZE:
+                rollup_model.objects.bulk_create(batch)
+                count, batch = count + len(batch), []
+        rollup_model.objects.bulk_create(batch)
+    return count + len(batch)
+
+
+def mark_dirty(property_id, year, month):
+    """
+    Schedule a rollup refresh for `property_id` from (year, month) onward when
+    the current transaction commits (immediately under autocommit). Marks
+    within one transaction collapse to a single refresh per property.
+    """
+    key = period_key(year, month)
+    pending = _state.__dict__.setdefault('pending', {})
+    pending[property_id] = min(key, pending.get(property_id, key))
+    transaction.on_commit(_flush)
+
+
+def mark_expenses_dirty(expenses):
+    """mark_dirty for a batch of Expense instances: one mark per property."""
+    earliest = {}
+    for e in expenses:
+        key = (e.year, e.month)
+        earliest[e.property_id] = min(key, earliest.get(e.property_id, key))
+    for property_id, (year, month) in earliest.items():
+        mark_dirty(property_id, year, month)
+
+
+def _flush():
+    pending = _state.__dict__.pop('pending', {})
+    for property_id, since in pending.items():
+        refresh_property(property_id, since)
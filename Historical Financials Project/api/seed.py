@@ -0,0 +1,70 @@
+import random
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .models import EXPENSE_CATEGORIES, Property, Expense, Unit
+
+PROPERTY_TYPES = ['Garden', 'High Rise', 'Mid Rise', 'Townhouse', 'Other']
+LOCATIONS = ['Austin', 'Dallas', 'Denver', 'Phoenix', 'Atlanta', 'Charlotte', 'Nashville', 'Tampa']
+
+
+def seed_portfolio(n_properties, n_months, n_units=0, start_year=2015, batch_size=5000, seed=0):
+    """
+    Bulk-insert a synthetic portfolio: `n_properties` properties, each with
+    `n_months` consecutive expense months from January of `start_year` and
+    `n_units` units. Deterministic for a given `seed`. Returns the new
+    properties.
+    """
+    rng = random.Random(seed)
+    props = Property.objects.bulk_create([
+        Property(
+            name=f'Property {i:06d}',
+            units=n_units or rng.randint(20, 400),
+            property_type=rng.choice(PROPERTY_TYPES),
+            location=rng.choice(LOCATIONS),
+        )
+        for i in range(n_properties)
+    ], batch_size=batch_size)
+    if not props or props[0].pk is None:
+        props = list(Property.objects.order_by('-pk')[:n_properties])[::-1]
+
+    def expenses():
+        for prop in props:
+            base = rng.uniform(500, 5000)  # dollars; stored as cents
+            for m in range(n_months):
+                year, month = divmod(m, 12)
+                yield Expense(
+                    property=prop, year=start_year + year, month=month + 1,
+                    **{k: round(base * rng.uniform(0.5, 1.5) * 100) for k in EXPENSE_CATEGORIES}
+                )
+
+    def units():
+        for prop in props:
+            for n in range(1, n_units + 1):
+                yield Unit(property=prop, unit_number=n, square_footage=rng.randint(450, 1400))
+
+    for rows in (expenses(), units()):
+        batch = []
+        for obj in rows:
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                type(obj).objects.bulk_create(batch)
+                batch = []
+        if batch:
+            type(batch[0]).objects.bulk_create(batch)
+    return props
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """
+    Run the block against a throwaway copy of the default database (the
+    test database), so benchmarks never seed into real data.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
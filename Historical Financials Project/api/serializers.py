@@ -1,18 +1,122 @@
 from rest_framework import serializers
-from .models import Property, Expense, Unit
+from .models import EXPENSE_CATEGORIES, CentsField, Property, Expense, ExpenseCategory, ImportJob, Unit
+from .money import MAX_CENTS, dollars, to_cents
+
+class DollarsField(serializers.Field):
+    """Dollar numbers on the wire, integer cents in the model (CentsField)."""
+    default_error_messages = {
+        'invalid': f'A valid dollar amount of at most {MAX_CENTS // 100:,} is required.',
+    }
+
+    def __init__(self, min_value=None, max_value=None, **kwargs):
+        # ModelSerializer passes the BIGINT range of the column; to_cents
+        # enforces the tighter MAX_CENTS bound instead
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            return to_cents(data)
+        except ValueError:
+            self.fail('invalid')
+
+    def to_representation(self, value):
+        return dollars(value)
+
+class MoneyModelSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping, CentsField: DollarsField,
+    }
 
 class UnitSerializer(serializers.ModelSerializer):
     class Meta:
         model  = Unit
-        fields = '__all__'
+        exclude = ['created_at', 'updated_at']
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(MoneyModelSerializer):
     class Meta:
         model = Expense
-        fields = '__all__'
+        exclude = ['created_at', 'updated_at']  # sync bookkeeping, see /api/changes/
+
+    def to_representation(self, instance):
+        # ?category= on the list keeps only the requested categories
+        data = super().to_representation(instance)
+        categories = self.context.get('categories')
+        if categories:
+            for k in EXPENSE_CATEGORIES:
+                if k not in categories:
+                    del data[k]
+        return data
+
+class NormalizedExpenseSerializer(ExpenseSerializer):
+    # category amounts divided by the `divisor` annotation (per unit / per sqft)
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for k in EXPENSE_CATEGORIES:
+            if k in data:
+                data[k] = data[k] / instance.divisor if instance.divisor else None
+        return data
+
+class WideExpenseSerializer(serializers.BaseSerializer):
+    """
+    Read-only: rows from api.facts.wide_rows (normalized storage) in
+    ExpenseSerializer's shape, limited to the categories they carry.
+    """
+    def to_representation(self, row):
+        data = {'id': row['id'], 'month': row['month'], 'year': row['year']}
+        data.update({k: dollars(row[k]) for k in EXPENSE_CATEGORIES if k in row})
+        data['property'] = row['property']
+        return data
+
+class ExpenseCategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExpenseCategory
+        fields = ['key', 'label', 'position']
+
+class NestedExpenseSerializer(MoneyModelSerializer):
+    # parent property is implied by nesting
+    class Meta:
+        model = Expense
+        exclude = ['property', 'created_at', 'updated_at']
 
 class PropertySerializer(serializers.ModelSerializer):
-    expenses = ExpenseSerializer(many=True, read_only=True)
     class Meta:
         model = Property
-        fields = '__all__'
\ No newline at end of file
+        exclude = ['created_at', 'updated_at']
+        read_only_fields = ['total_sqft', 'avg_sqft']  # derived from units
+
+class PropertyWithExpensesSerializer(PropertySerializer):
+    expenses = NestedExpenseSerializer(many=True, read_only=True)
+
+class BulkUnitSerializer(serializers.ModelSerializer):
+    # property existence and (property, unit_number) conflicts are
+    # resolved once per batch in api.bulk instead of once per row
+    property = serializers.IntegerField()
+    class Meta:
+        model = Unit
+        exclude = ['id']
+        validators = []
+
+class BulkExpenseSerializer(MoneyModelSerializer):
+    property = serializers.IntegerField()
+    class Meta:
+        model = Expense
+        exclude = ['id']
+        validators = []
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    file = serializers.FileField(write_only=True)
+    rows_per_second = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'kind', 'file', 'filename', 'property', 'status', 'total_rows',
+            'rows_processed', 'rows_per_second', 'error_count', 'errors', 'result',
+            'message', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = [f for f in fields if f not in ('kind', 'file', 'property')]
+
+    def validate(self, data):
+        if data['kind'] == 'units' and not data.get('property'):
+            raise serializers.ValidationError({'property': 'Required for unit imports.'})
+        return data
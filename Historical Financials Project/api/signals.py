@@ -0,0 +1,64 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .changes import record_deleted
+from .facts import normalized, sync_facts
+from .footage import units_changed
+from .models import Expense, Property, Unit
+from .rollups import mark_dirty
+from .versioning import resource_for, touch
+
+
+@receiver(pre_save, sender=Expense)
+def remember_period(sender, instance, **kwargs):
+    # an update may move the row to another property or month; both need refreshing
+    if instance.pk:
+        instance._old_period = (
+            Expense.objects.filter(pk=instance.pk).values_list('property_id', 'year', 'month').first()
+        )
+
+
+@receiver(post_save, sender=Expense)
+def expense_saved(sender, instance, **kwargs):
+    old = getattr(instance, '_old_period', None)
+    if old:
+        mark_dirty(*old)
+    mark_dirty(instance.property_id, instance.year, instance.month)
+    if normalized():
+        sync_facts([instance])  # deletes cascade to the facts
+
+
+@receiver(post_delete, sender=Expense)
+def expense_deleted(sender, instance, **kwargs):
+    mark_dirty(instance.property_id, instance.year, instance.month)
+
+
+@receiver(pre_save, sender=Unit)
+def remember_unit_property(sender, instance, **kwargs):
+    if instance.pk:
+        instance._old_property = (
+            Unit.objects.filter(pk=instance.pk).values_list('property_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+def unit_changed(sender, instance, **kwargs):
+    # total_sqft / avg_sqft changed
+    units_changed({instance.property_id, getattr(instance, '_old_property', None)} - {None})
+
+
+@receiver(post_delete, sender=Property)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Unit)
+def record_deletion(sender, instance, **kwargs):
+    # cascaded deletes included; feeds /api/changes/, one INSERT per transaction
+    record_deleted(resource_for(sender), instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Property)
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=Unit)
+def bump_version(sender, **kwargs):
+    # ETags and cached responses of the read endpoints key on these; once per transaction
+    touch(resource_for(sender))
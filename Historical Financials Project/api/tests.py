@@ -1,3 +1,995 @@
-from django.test import TestCase
+import csv
+import importlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+
+from .aggregates import rollup_totals, trailing_totals
+from .cache_backends import BoundedLocMemCache
+from .caching import _cache_key
+from .footage import refresh_footage
+from .profiling import _profiler_lock, reset_metrics
+from .renderers import JSONRowsRenderer
+from .serializers import ExpenseSerializer
+from .models import EXPENSE_CATEGORIES, Property, Expense, ExpenseFact, ExpenseRollup, ImportJob, Tombstone, Unit
+
+# the Streamlit client's DataFrame code, checked against the API it reads
+sys.path.insert(0, str(settings.BASE_DIR / 'streamlit_app'))
+import frames  # noqa: E402
+import store  # noqa: E402
+from baselines import trailing_loop  # noqa: E402
+
+
+def make_property(name='Oak Court', units=10, **kwargs):
+    return Property.objects.create(
+        name=name, units=units,
+        property_type=kwargs.get('property_type', 'Garden'),
+        location=kwargs.get('location', 'Austin'),
+    )
+
+
+def reload_urls():
+    """Re-import the URLconf, whose routes depend on settings read at import."""
+    importlib.reload(importlib.import_module('api.urls'))
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+def make_expense(prop, year, month, amount=100.0):
+    # `amount` in dollars; the model stores cents
+    return Expense.objects.create(
+        property=prop, year=year, month=month,
+        **{k: round(amount * 100) for k in EXPENSE_CATEGORIES}
+    )
+
+
+class TrailingExpensesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.oak = make_property('Oak Court', units=10)
+        self.elm = make_property('Elm Street', units=4)
+        # 14 months for Oak: Jan 2023 .. Feb 2024, amount == month index
+        with self.captureOnCommitCallbacks(execute=True):  # rollup refresh
+            for i in range(14):
+                make_expense(self.oak, 2023 + i // 12, i % 12 + 1, amount=float(i + 1))
+            make_expense(self.elm, 2024, 5, amount=40.0)
+
+    def test_t3_sums_latest_three_months(self):
+        resp = self.client.get('/api/expenses/trailing/', {'window': 3})
+        self.assertEqual(resp.status_code, 200)
+        rows = {r['property']: r for r in resp.json()}
+        oak = rows[self.oak.id]
+        self.assertEqual(oak['months'], 3)
+        self.assertEqual(oak['payroll'], 12 + 13 + 14)
+        self.assertEqual((oak['start_year'], oak['start_month']), (2023, 12))
+        self.assertEqual((oak['end_year'], oak['end_month']), (2024, 2))
+        self.assertEqual(rows[self.elm.id]['months'], 1)
+
+    def test_t12_per_unit_and_property_filter(self):
+        resp = self.client.get('/api/expenses/trailing/', {
+            'window': 12, 'property': str(self.oak.id), 'per_unit': 'true',
+        })
+        rows = resp.json()
+        self.assertEqual([r['property'] for r in rows], [self.oak.id])
+        self.assertAlmostEqual(rows[0]['taxes'], sum(range(3, 15)) / 10)
+
+    def test_rejects_unknown_window(self):
+        resp = self.client.get('/api/expenses/trailing/', {'window': 6})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_client_trailing_sums_match_server_and_loop(self):
+        expenses = pd.DataFrame(self.client.get('/api/expenses/', {'page_size': 500}).json()['results'])
+        props = pd.DataFrame(self.client.get('/api/properties/').json()['results'])
+        for window, per, params in ((3, None, {}), (12, 'unit', {'per_unit': '1'})):
+            sums = frames.trailing_sums(expenses, props, window, per).set_index('property')
+            loop = trailing_loop(expenses, props, window, per).set_index('property')
+            server = self.client.get('/api/expenses/trailing/', {'window': window, **params}).json()
+            self.assertEqual(len(sums), len(server))
+            for row in server:
+                self.assertEqual(sums.at[row['property'], 'months'], row['months'])
+                for k in EXPENSE_CATEGORIES:
+                    self.assertAlmostEqual(sums.at[row['property'], k], row[k])
+                    self.assertAlmostEqual(loop.at[row['property'], k], row[k])
+
+
+class PropertyListQueryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def _count_queries(self, n_properties, params=None):
+        with self.captureOnCommitCallbacks(execute=True):  # version bumps
+            Property.objects.all().delete()
+            for i in range(n_properties):
+                prop = make_property(f'Property {i}')
+                make_expense(prop, 2024, 1)
+                make_expense(prop, 2024, 2)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get('/api/properties/', params or {})
+        self.assertEqual(resp.status_code, 200)
+        rows = resp.json()['results']
+        self.assertEqual(len(rows), n_properties)
+        return len(ctx.captured_queries), rows
+
+    def test_list_omits_expenses_with_constant_queries(self):
+        small, rows = self._count_queries(1)
+        large, _ = self._count_queries(25)
+        self.assertEqual(small, large)
+        self.assertNotIn('expenses', rows[0])
+
+    def test_include_expenses_is_prefetched(self):
+        small, rows = self._count_queries(1, {'include': 'expenses'})
+        large, _ = self._count_queries(25, {'include': 'expenses'})
+        self.assertEqual(small, large)
+        self.assertEqual(len(rows[0]['expenses']), 2)
+        self.assertNotIn('property', rows[0]['expenses'][0])
+
+
+class BulkUpsertTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.prop = make_property('Oak Court', units=3)
+
+    def test_units_bulk_creates_and_updates(self):
+        Unit.objects.create(property=self.prop, unit_number=1, square_footage=500)
+        rows = [
+            {'property': self.prop.id, 'unit_number': n, 'square_footage': 700 + n}
+            for n in (1, 2, 3)
+        ]
+        rows.append({'property': 9999, 'unit_number': 4, 'square_footage': 1})
+        rows.append({'property': self.prop.id, 'unit_number': 5})
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post('/api/units/bulk/', rows, format='json')
+        self.assertLess(len(ctx.captured_queries), 10)
+        body = resp.json()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((body['created'], body['updated'], body['error']), (2, 1, 2))
+        self.assertEqual([r['status'] for r in body['results']],
+                         ['updated', 'created', 'created', 'error', 'error'])
+        self.assertEqual(
+            list(self.prop.unit_entries.order_by('unit_number').values_list('square_footage', flat=True)),
+            [701, 702, 703],
+        )
+
+    def test_expenses_bulk_upserts_on_period(self):
+        make_expense(self.prop, 2024, 1, amount=1.0)
+        row = {'property': self.prop.id, 'year': 2024, **{k: 5.0 for k in EXPENSE_CATEGORIES}}
+        rows = [{**row, 'month': 1}, {**row, 'month': 2}, {**row, 'month': 2, 'payroll': 9.0}]
+        body = self.client.post('/api/expenses/bulk/', rows, format='json').json()
+        self.assertEqual([r['status'] for r in body['results']],
+                         ['updated', 'duplicate', 'created'])
+        self.assertEqual(Expense.objects.count(), 2)
+        self.assertEqual(Expense.objects.get(month=1).payroll, 500)
+        self.assertEqual(Expense.objects.get(month=2).payroll, 900)
+
+    def test_bulk_requires_list(self):
+        resp = self.client.post('/api/expenses/bulk/', {'property': self.prop.id}, format='json')
+        self.assertEqual(resp.status_code, 400)
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        prop = make_property()
+        for month in range(1, 13):
+            make_expense(prop, 2024, month)
+
+    def test_expenses_are_cursor_paginated_by_id(self):
+        seen, url = [], '/api/expenses/?page_size=5'
+        while url:
+            body = self.client.get(url).json()
+            self.assertLessEqual(len(body['results']), 5)
+            seen += [r['id'] for r in body['results']]
+            url = body['next']
+        self.assertEqual(seen, sorted(Expense.objects.values_list('id', flat=True)))
+
+
+class FilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.oak = make_property('Oak Court', units=10, property_type='Garden', location='Austin')
+        self.elm = make_property('Elm Street', units=200, property_type='High Rise', location='Dallas, TX')
+        for prop in (self.oak, self.elm):
+            for i in range(24):
+                make_expense(prop, 2023 + i // 12, i % 12 + 1)
+            Unit.objects.create(property=prop, unit_number=1, square_footage=800)
+
+    def _results(self, path, params):
+        resp = self.client.get(path, params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()['results']
+
+    def test_expense_period_range_and_property(self):
+        rows = self._results('/api/expenses/', {
+            'property': f'{self.oak.id}', 'start': '2023-11', 'end': '2024-02', 'page_size': 100,
+        })
+        self.assertEqual([(r['year'], r['month']) for r in rows],
+                         [(2023, 11), (2023, 12), (2024, 1), (2024, 2)])
+
+    def test_property_level_filters_on_expenses_units_and_properties(self):
+        params = {'location': 'Dallas, TX', 'units_min': 100, 'page_size': 100}
+        self.assertEqual({r['property'] for r in self._results('/api/expenses/', params)}, {self.elm.id})
+        self.assertEqual([r['property'] for r in self._results('/api/units/', params)], [self.elm.id])
+        self.assertEqual([r['id'] for r in self._results('/api/properties/', params)], [self.elm.id])
+        garden = self._results('/api/units/', {'property_type': ['Garden', 'Townhouse']})
+        self.assertEqual([r['property'] for r in garden], [self.oak.id])
+
+    def test_trailing_honours_filters(self):
+        rows = self.client.get('/api/expenses/trailing/', {
+            'window': 3, 'property_type': 'Garden', 'end': '2023-06',
+        }).json()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['end_year'], rows[0]['end_month']), (2023, 6))
+
+    def test_bad_period_is_rejected(self):
+        self.assertEqual(self.client.get('/api/expenses/', {'start': '2024-13'}).status_code, 400)
+
+    def test_modified_since_lists_only_rows_written_after(self):
+        since = timezone.now() - timedelta(days=1)
+        Expense.objects.update(updated_at=since - timedelta(days=1))
+        Property.objects.update(updated_at=since - timedelta(days=1))
+        row = {'property': self.oak.id, 'year': 2023, 'month': 5, **{k: 7.0 for k in EXPENSE_CATEGORIES}}
+        self.client.post('/api/expenses/bulk/', [row], format='json')
+        Unit.objects.create(property=self.elm, unit_number=2, square_footage=900)  # new avg_sqft
+
+        params = {'modified_since': since.isoformat(), 'page_size': 100}
+        rows = self._results('/api/expenses/', params)
+        self.assertEqual([(r['property'], r['year'], r['month']) for r in rows], [(self.oak.id, 2023, 5)])
+        self.assertEqual([r['id'] for r in self._results('/api/properties/', params)], [self.elm.id])
+        self.assertEqual(self.client.get('/api/expenses/', {'modified_since': 'yesterday'}).status_code, 400)
+
+
+class ColumnarFormatTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.prop = make_property()
+        for month in range(1, 4):
+            make_expense(self.prop, 2024, month, amount=month * 1.5)
+
+    def test_csv_via_accept_header(self):
+        resp = self.client.get('/api/expenses/', {'start': '2024-02'}, HTTP_ACCEPT='text/csv')
+        self.assertEqual(resp['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(resp.content.decode())))
+        self.assertEqual([r['month'] for r in rows], ['2', '3'])
+        self.assertEqual(float(rows[0]['payroll']), 3.0)
+
+    def test_arrow_and_parquet_round_trip(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow not installed')
+        table = pa.ipc.open_stream(self.client.get('/api/expenses/', {'format': 'arrow'}).content).read_all()
+        self.assertEqual(table.column('month').to_pylist(), [1, 2, 3])
+        self.assertEqual(table.schema.field('taxes').type, pa.float64())
+        body = self.client.get('/api/expenses/', HTTP_ACCEPT='application/vnd.apache.parquet').content
+        self.assertEqual(pq.read_table(io.BytesIO(body)).num_rows, 3)
+
+    def test_columnar_formats_only_on_list(self):
+        resp = self.client.get('/api/expenses/trailing/', {'format': 'csv'})
+        self.assertEqual(resp.status_code, 404)
+
+
+class MoneyTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.prop = make_property(units=3)
+
+    def _post_months(self, amount, months=12):
+        rows = [
+            {'property': self.prop.id, 'year': 2024, 'month': m, **{k: amount for k in EXPENSE_CATEGORIES}}
+            for m in range(1, months + 1)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/expenses/bulk/', rows, format='json')
+
+    def test_totals_are_exact(self):
+        # twelve float 0.1s sum to 1.2000000000000002; twelve 10-cent rows don't
+        self._post_months(0.1)
+        rollup = self.client.get('/api/expenses/trailing/', {'window': 12}).json()[0]
+        summed = self.client.get('/api/expenses/trailing/', {'window': 12, 'end': '2024-12'}).json()[0]
+        self.assertEqual(rollup['payroll'], 1.2)
+        self.assertEqual(summed['payroll'], 1.2)
+        self.assertEqual(ExpenseRollup.objects.get(is_latest=True).t12_total, 12 * 10 * len(EXPENSE_CATEGORIES))
+
+    def test_dollar_amounts_round_to_cents(self):
+        self._post_months('1234.565', months=1)
+        self.assertEqual(Expense.objects.get().payroll, 123457)
+        row = {'property': self.prop.id, 'year': 2024, 'month': 2, **{k: 1 for k in EXPENSE_CATEGORIES}}
+        for bad in ('abc', 'NaN', True, 1e300):
+            resp = self.client.post('/api/expenses/', {**row, 'taxes': bad}, format='json')
+            self.assertEqual(resp.status_code, 400, bad)
+            self.assertIn('taxes', resp.json())
+
+    def test_json_fast_path_matches_serializer(self):
+        make_expense(self.prop, 2024, 1, amount=0.07)
+        make_expense(self.prop, 2024, 2, amount=-12.5)
+        make_expense(self.prop, 2024, 3, amount=1999999.99)
+        body = self.client.get('/api/expenses/', {'page_size': 2}).json()
+        results = body['results'] + self.client.get(body['next']).json()['results']
+        expected = ExpenseSerializer(Expense.objects.order_by('id'), many=True).data
+        self.assertEqual([list(r.items()) for r in results], [list(r.items()) for r in expected])
+        self.assertEqual([r['payroll'] for r in results], [0.07, -12.5, 1999999.99])
+
+    def test_csv_writes_exact_cents(self):
+        make_expense(self.prop, 2024, 1, amount=0.1)
+        rows = list(csv.DictReader(io.StringIO(self.client.get('/api/expenses/', {'format': 'csv'}).content.decode())))
+        self.assertEqual(rows[0]['payroll'], '0.10')
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.prop = make_property(units=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(18):
+                make_expense(self.prop, 2023 + i // 12, i % 12 + 1, amount=float(i + 1))
+
+    def assertMatchesExpenses(self):
+        for window in (3, 12):
+            for per in (None, 'unit', 'sqft'):
+                fresh = list(trailing_totals(window, per=per))
+                stored = list(rollup_totals(window, per=per))
+                self.assertEqual(len(fresh), len(stored))
+                for a, b in zip(fresh, stored):
+                    self.assertEqual(a.keys(), b.keys())
+                    for k in a:
+                        if a[k] is None:
+                            self.assertIsNone(b[k])
+                        else:
+                            self.assertAlmostEqual(a[k], b[k])
+
+    def test_rollups_track_creates(self):
+        latest = ExpenseRollup.objects.get(is_latest=True)
+        self.assertEqual((latest.year, latest.month), (2024, 6))
+        self.assertEqual(latest.t3_payroll, (16 + 17 + 18) * 100)
+        self.assertEqual(latest.total, 1800 * len(EXPENSE_CATEGORIES))
+        self.assertEqual(ExpenseRollup.objects.count(), 18)
+        self.assertMatchesExpenses()
+
+    def test_rollups_track_updates_deletes_and_bulk(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            e = Expense.objects.get(year=2024, month=5)
+            e.payroll = 10000
+            e.save()
+            Expense.objects.get(year=2024, month=6).delete()
+        self.assertEqual(ExpenseRollup.objects.get(is_latest=True).month, 5)
+        self.assertMatchesExpenses()
+
+        row = {'property': self.prop.id, 'year': 2024, **{k: 1.0 for k in EXPENSE_CATEGORIES}}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/expenses/bulk/', [{**row, 'month': 1}, {**row, 'month': 9}], format='json')
+        self.assertEqual(ExpenseRollup.objects.get(is_latest=True).month, 9)
+        self.assertMatchesExpenses()
+
+    def test_trailing_endpoint_reads_rollups_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            rows = self.client.get('/api/expenses/trailing/', {'window': 12}).json()
+        # the resource version lookup for the ETag, then one rollup read
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertIn('api_resourceversion', ctx.captured_queries[0]['sql'])
+        self.assertIn('api_expenserollup', ctx.captured_queries[1]['sql'])
+        self.assertEqual(rows[0]['months'], 12)
+
+    def test_rebuild_command(self):
+        ExpenseRollup.objects.all().delete()
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        self.assertEqual(ExpenseRollup.objects.count(), 18)
+        self.assertMatchesExpenses()
+
+
+class SquareFootageTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.prop = make_property(units=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_expense(self.prop, 2024, 1, amount=1000.0)
+
+    def _footage(self):
+        self.prop.refresh_from_db()
+        return self.prop.total_sqft, self.prop.avg_sqft
+
+    def test_footage_tracks_unit_writes(self):
+        self.assertEqual(self._footage(), (0, None))
+        unit = Unit.objects.create(property=self.prop, unit_number=1, square_footage=400)
+        self.assertEqual(self._footage(), (400, 400))
+        self.client.post('/api/units/bulk/', [
+            {'property': self.prop.id, 'unit_number': 1, 'square_footage': 500},
+            {'property': self.prop.id, 'unit_number': 2, 'square_footage': 700},
+        ], format='json')
+        self.assertEqual(self._footage(), (1200, 600))
+        unit.refresh_from_db()
+        unit.delete()
+        self.assertEqual(self._footage(), (700, 700))
+        other = make_property('Elm Street')
+        Unit.objects.filter(property=self.prop).update(property=other)  # bypasses signals
+        refresh_footage()
+        self.assertEqual(self._footage(), (0, None))
+
+    def test_per_sqft_on_expenses_and_trailing(self):
+        for n, sqft in ((1, 400), (2, 600)):
+            Unit.objects.create(property=self.prop, unit_number=n, square_footage=sqft)
+        resp = self.client.get('/api/expenses/', {'per_sqft': '1'})
+        self.assertAlmostEqual(resp.json()['results'][0]['taxes'], 1000 / 500)
+        resp = self.client.get('/api/expenses/', {'per_sqft': '1', 'format': 'csv'})
+        self.assertIn(',2.0,', resp.content.decode())
+        resp = self.client.get('/api/expenses/trailing/', {'window': 3, 'per_sqft': '1'})
+        self.assertAlmostEqual(resp.json()[0]['taxes'], 2.0)
+        resp = self.client.get('/api/expenses/trailing/', {'per_sqft': '1', 'per_unit': '1'})
+        self.assertEqual(resp.status_code, 400)
+
+
+class DistributionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.oak = make_property('Oak Court', units=10, property_type='Garden')
+        self.elm = make_property('Elm Street', units=2, property_type='Garden')
+        self.ash = make_property('Ash Tower', units=4, property_type='High Rise')
+        for i, amount in enumerate([1, 2, 3, 4, 100]):
+            make_expense(self.oak, 2024, i + 1, amount=float(amount))
+        for month in (1, 2):
+            make_expense(self.elm, 2024, month, amount=10.0)
+        make_expense(self.ash, 2024, 1, amount=8.0)
+        for n, sqft in ((1, 400), (2, 600)):
+            Unit.objects.create(property=self.ash, unit_number=n, square_footage=sqft)
+
+    def _get(self, **params):
+        resp = self.client.get('/api/analytics/distribution/', {'category': 'taxes', **params})
+        self.assertEqual(resp.status_code, 200)
+        body = resp.json()
+        return {r['property']: r for r in body['properties']}, {r['property_type']: r for r in body['property_types']}
+
+    def test_quartiles_whiskers_and_outliers_match_numpy(self):
+        import numpy as np
+        props, types = self._get()
+        oak = props[self.oak.id]
+        values = [1, 2, 3, 4, 100]
+        self.assertEqual(oak['n'], 5)
+        self.assertAlmostEqual(oak['q1'], np.percentile(values, 25))
+        self.assertAlmostEqual(oak['median'], 3)
+        self.assertAlmostEqual(oak['q3'], np.percentile(values, 75))
+        self.assertEqual((oak['lower_whisker'], oak['upper_whisker']), (1, 4))
+        self.assertEqual(oak['outliers'], [100])
+        self.assertEqual(types['Garden']['n'], 7)
+        self.assertEqual(types['High Rise']['median'], 8)
+
+    def test_normalization(self):
+        props, _ = self._get(per_unit='1')
+        self.assertAlmostEqual(props[self.elm.id]['median'], 5)
+        props, _ = self._get(per_sqft='1')
+        self.assertAlmostEqual(props[self.ash.id]['median'], 8 / 500)
+        self.assertNotIn(self.oak.id, props)  # no unit data, nothing to divide by
+
+    def test_validation(self):
+        resp = self.client.get('/api/analytics/distribution/', {'category': 'rent'})
+        self.assertEqual(resp.status_code, 400)
+
+
+@override_settings(EXPENSE_STORAGE='normalized')
+class NormalizedStorageTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.oak = make_property('Oak Court', units=4)
+        self.elm = make_property('Elm Street', units=2)
+        row = {'year': 2024, **{k: 10.0 for k in EXPENSE_CATEGORIES}}
+        rows = [{**row, 'property': p.id, 'month': m, 'taxes': 7.5 * m} for p in (self.oak, self.elm) for m in (1, 2, 3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/expenses/bulk/', rows, format='json')
+
+    def test_writes_keep_one_fact_per_category(self):
+        self.assertEqual(ExpenseFact.objects.count(), 6 * len(EXPENSE_CATEGORIES))
+        e = Expense.objects.get(property=self.oak, month=2)
+        e.taxes = 99900
+        e.save()
+        self.assertEqual(e.facts.get(category__key='taxes').amount, 99900)
+        self.client.delete(f'/api/expenses/{e.id}/')
+        self.assertEqual(ExpenseFact.objects.count(), 5 * len(EXPENSE_CATEGORIES))
+        ExpenseFact.objects.all().delete()
+        call_command('rebuild_expense_facts', stdout=io.StringIO())
+        self.assertEqual(ExpenseFact.objects.count(), 5 * len(EXPENSE_CATEGORIES))
+
+    def test_category_list_reads_facts_in_wide_shape(self):
+        with CaptureQueriesContext(connection) as ctx:
+            body = self.client.get('/api/expenses/', {'category': 'taxes,payroll'}).json()
+        facts_sql = [q['sql'] for q in ctx.captured_queries if 'api_expensefact' in q['sql']]
+        self.assertEqual(len(facts_sql), 1)
+        first = body['results'][0]
+        self.assertEqual(list(first), ['id', 'month', 'year', 'payroll', 'taxes', 'property'])
+        self.assertEqual((first['taxes'], first['payroll']), (7.5, 10.0))
+        with self.settings(EXPENSE_STORAGE='wide'):
+            wide = self.client.get('/api/expenses/', {'category': 'payroll,taxes', 'page_size': 10}).json()
+        self.assertEqual(wide['results'], body['results'])
+        self.assertEqual(self.client.get('/api/expenses/', {'category': 'rent'}).status_code, 400)
+
+    def test_distribution_reads_one_category(self):
+        with CaptureQueriesContext(connection) as ctx:
+            body = self.client.get('/api/analytics/distribution/', {'category': 'taxes'}).json()
+        amounts_sql = next(q['sql'] for q in ctx.captured_queries if 'api_expensefact' in q['sql'])
+        self.assertNotIn('api_expense"', amounts_sql.replace('api_expensefact', ''))
+        oak = next(r for r in body['properties'] if r['property'] == self.oak.id)
+        self.assertEqual((oak['min'], oak['median'], oak['max']), (7.5, 15.0, 22.5))
+
+    def test_category_dimension_endpoint(self):
+        keys = [c['key'] for c in self.client.get('/api/expense-categories/').json()]
+        self.assertEqual(keys, EXPENSE_CATEGORIES)
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.oak = make_property('Oak Court')
+        self.jan = make_expense(self.oak, 2024, 1)
+        self.unit = Unit.objects.create(property=self.oak, unit_number=1, square_footage=800)
+        self.since = timezone.now()
+
+    def _feed(self, **params):
+        resp = self.client.get('/api/changes/', params)
+        self.assertEqual(resp.status_code, 200)
+        return json.loads(b''.join(resp.streaming_content))
+
+    def _ops(self, body):
+        return [(c['resource'], c['op'], c['id']) for c in body['changes']]
+
+    def test_without_cursor_every_row_is_an_insert(self):
+        body = self._feed()
+        self.assertEqual(sorted(self._ops(body)), sorted([
+            ('properties', 'insert', self.oak.id), ('expenses', 'insert', self.jan.id),
+            ('units', 'insert', self.unit.id),
+        ]))
+        expense = next(c for c in body['changes'] if c['resource'] == 'expenses')
+        self.assertEqual(expense['data']['payroll'], 100.0)
+
+    def test_inserts_updates_and_deletes_since_cursor_in_time_order(self):
+        row = {'property': self.oak.id, 'year': 2024, **{k: 5.0 for k in EXPENSE_CATEGORIES}}
+        self.client.post('/api/expenses/bulk/', [{**row, 'month': 1}, {**row, 'month': 2}], format='json')
+        feb = Expense.objects.get(month=2)
+        with self.captureOnCommitCallbacks(execute=True):  # tombstones are written on commit
+            self.client.delete(f'/api/units/{self.unit.id}/')  # also refreshes the property's footage
+
+        body = self._feed(since=self.since.isoformat())
+        self.assertEqual(self._ops(body), [
+            ('expenses', 'update', self.jan.id), ('expenses', 'insert', feb.id),
+            ('properties', 'update', self.oak.id), ('units', 'delete', self.unit.id),
+        ])
+        self.assertIsNone(body['changes'][2]['data']['avg_sqft'])
+        self.assertEqual(self._ops(self._feed(since=body['cursor'], resource='units')),
+                         [('units', 'delete', self.unit.id)])
+
+    def test_cascaded_deletes_leave_tombstones(self):
+        for month in range(2, 15):
+            make_expense(self.oak, 2024 + month // 13, (month - 1) % 12 + 1)
+        expenses = [('expenses', 'delete', pk) for pk in Expense.objects.values_list('pk', flat=True)]
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/properties/{self.oak.id}/')
+        sql = [q['sql'] for q in ctx.captured_queries]
+        ops = self._ops(self._feed(since=self.since.isoformat()))
+        self.assertEqual(sorted(ops), sorted([
+            ('properties', 'delete', self.oak.id), ('units', 'delete', self.unit.id), *expenses,
+        ]))
+        self.assertEqual(len([q for q in sql if q.startswith('INSERT INTO "api_tombstone"')]), 1)
+        # facts and rollups have no delete receivers, so they are deleted without being loaded
+        self.assertFalse([q for q in sql if q.startswith('SELECT "api_expensefact"')])
+        self.assertIn('DELETE FROM "api_expenserollup" WHERE "api_expenserollup"."property_id" IN (%d)'
+                      % self.oak.id, sql)
+
+    def test_rolled_back_deletes_leave_no_tombstones(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Unit.objects.filter(pk=self.unit.pk).delete()
+                with self.assertRaises(ValueError), transaction.atomic():
+                    self.jan.delete()
+                    raise ValueError
+        self.assertEqual(list(Tombstone.objects.values_list('resource', 'object_id')),
+                         [('units', self.unit.id)])
+
+    def test_head_returns_the_cursor(self):
+        resp = self.client.head('/api/changes/')
+        self.assertEqual(resp.status_code, 200)
+        cursor = datetime.fromisoformat(resp['X-Changes-Cursor'])
+        self.assertLessEqual(cursor, timezone.now() - settings.CHANGES_CURSOR_LAG)
+
+    def test_expired_cursor_and_pruning(self):
+        old = timezone.now() - settings.TOMBSTONE_RETENTION - timedelta(days=1)
+        resp = self.client.get('/api/changes/', {'since': old.isoformat()})
+        self.assertEqual(resp.status_code, 410)
+        Tombstone.objects.create(resource='units', object_id=99, deleted_at=old)
+        Tombstone.objects.create(resource='units', object_id=100)
+        call_command('prune_tombstones', stdout=io.StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [100])
+        self.assertEqual(self.client.get('/api/changes/', {'resource': 'leases'}).status_code, 400)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.oak = make_property('Oak Court', units=4, location='Dallas')
+        self.elm = make_property('Elm Street')
+        make_expense(self.oak, 2024, 2, amount=12.05)
+        make_expense(self.oak, 2024, 1)
+        make_expense(self.elm, 2023, 12)
+
+    def test_csv_streams_months_with_property_metadata(self):
+        resp = self.client.get('/api/export/', {'property': self.oak.id, 'category': 'taxes'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertIn('expenses.csv', resp['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(resp.streaming_content).decode())))
+        self.assertEqual([(r['year'], r['month'], r['taxes']) for r in rows],
+                         [('2024', '1', '100.00'), ('2024', '2', '12.05')])
+        self.assertEqual((rows[0]['property_name'], rows[0]['location'], rows[0]['units']),
+                         ('Oak Court', 'Dallas', '4'))
+        self.assertNotIn('payroll', rows[0])
+
+    def test_xlsx_workbook(self):
+        resp = self.client.get('/api/export/', {'format': 'xlsx', 'start': '2024-01'})
+        self.assertEqual(resp.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(resp.streaming_content)), read_only=True)['Expenses']
+        header, *rows = sheet.iter_rows(values_only=True)
+        self.assertEqual(header[:3], ('property', 'property_name', 'property_type'))
+        self.assertEqual([(r[1], r[8], r[header.index('payroll')]) for r in rows],
+                         [('Oak Court', 1, 100), ('Oak Court', 2, 12.05)])
+        self.assertEqual(self.client.get('/api/export/', {'category': 'rent'}).status_code, 400)
+
+    @override_settings(EXPORT_XLSX_MAX_ROWS=2)
+    def test_large_xlsx_is_refused_but_csv_streams(self):
+        resp = self.client.get('/api/export/', {'format': 'xlsx'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('format=csv', json.loads(resp.content)['format'][0])
+        self.assertEqual(self.client.get('/api/export/', {'format': 'xlsx', 'property': self.oak.id}).status_code, 200)
+        self.assertEqual(self.client.get('/api/export/', {'format': 'csv'}).status_code, 200)
+
+
+def prop_row(id, name, units):
+    return {'id': id, 'name': name, 'units': units, 'property_type': 'Garden', 'location': 'Austin',
+            'total_sqft': 0.0, 'avg_sqft': None}
+
+
+def expense_row(id, prop, month, amount):
+    return {'id': id, 'property': prop, 'year': 2024, 'month': month, **{k: amount for k in EXPENSE_CATEGORIES}}
+
+
+class ClientFrameTests(SimpleTestCase):
+    """The Streamlit client's frame folding (streamlit_app/frames.py)."""
+    def setUp(self):
+        self.props = frames.property_frame([prop_row(1, 'Oak Court', 4), prop_row(2, 'Elm Street', 2)])
+        self.expenses = frames.expense_frame(pd.DataFrame([
+            expense_row(10, 1, 1, 1.0), expense_row(11, 1, 2, 2.0), expense_row(12, 2, 1, 3.0),
+        ]))
+        self.monthly = frames.merge_monthly(self.expenses, self.props)
+
+    def _rows(self, *rows):
+        return frames.expense_frame(pd.DataFrame(list(rows), columns=frames.EXPENSE_FIELDS))
+
+    def test_upsert_overwrites_in_place_and_appends(self):
+        rows = self._rows(expense_row(11, 1, 2, 5.0), expense_row(13, 2, 2, 6.0))
+        out = frames.upsert(self.expenses, rows)
+        self.assertEqual(out['id'].tolist(), [10, 11, 12, 13])
+        self.assertEqual(out['taxes'].tolist(), [1.0, 5.0, 3.0, 6.0])
+        self.assertEqual(self.expenses['taxes'].tolist(), [1.0, 2.0, 3.0])  # the input is not modified
+        self.assertIs(frames.upsert(self.expenses, self._rows()), self.expenses)
+
+    def test_remove(self):
+        self.assertEqual(frames.remove(self.expenses, {10, 12, 99})['id'].tolist(), [11])
+        self.assertIs(frames.remove(self.expenses, set()), self.expenses)
+
+    def test_patch_amounts_matches_a_fresh_merge(self):
+        changed = self._rows(expense_row(12, 2, 1, 9.0))
+        patched = frames.patch_amounts(self.monthly, changed)
+        fresh = frames.merge_monthly(frames.upsert(self.expenses, changed), self.props)
+        pd.testing.assert_frame_equal(patched, fresh)
+        self.assertEqual(self.monthly.set_index('id').at[12, 'payroll'], 3.0)
+        # new or moved months need the full merge
+        self.assertIsNone(frames.patch_amounts(self.monthly, self._rows(expense_row(12, 2, 3, 9.0))))
+        self.assertIsNone(frames.patch_amounts(self.monthly, self._rows(expense_row(14, 2, 3, 9.0))))
+
+
+class PortfolioStoreTests(SimpleTestCase):
+    """streamlit_app/store.py folding the change feed, with the API calls stubbed."""
+    def setUp(self):
+        self.props = [prop_row(1, 'Oak Court', 4), prop_row(2, 'Elm Street', 2)]
+        self.expenses = pd.DataFrame([expense_row(10, 1, 1, 1.0), expense_row(11, 1, 2, 2.0),
+                                      expense_row(12, 2, 1, 3.0)])
+        self.cursor = timezone.now()
+        self.feed, self.reads = [], []
+        self.enterContext(mock.patch.object(store, 'get_changes_cursor', lambda: self.cursor))
+        self.enterContext(mock.patch.object(store, 'get_modified', self._modified))
+        self.enterContext(mock.patch.object(store, 'get_changes', self._changes))
+        self.store = store.PortfolioStore()
+
+    def _modified(self, path, since=None, fmt=None):
+        return (self.props if path == 'properties' else self.expenses), None
+
+    def _changes(self, since, resources):
+        self.reads.append(since)
+        return self.feed.pop(0)
+
+    def _change(self, resource, op, id, data=None):
+        change = {'resource': resource, 'op': op, 'id': id, 'at': self.cursor.isoformat()}
+        return {**change, 'data': data} if data else change
+
+    def test_changes_are_applied_once(self):
+        first = self.store.snapshot()
+        update = self._change('expenses', 'update', 11, expense_row(11, 1, 2, 5.0))
+        insert = self._change('expenses', 'insert', 13, expense_row(13, 1, 3, 6.0))
+        later = self.cursor + timedelta(minutes=1)
+        # the second read repeats the lagging window
+        self.feed = [([update], later), ([update, insert], later + timedelta(minutes=1))]
+        patched = self.store.snapshot()
+        self.assertEqual(self.reads, [self.cursor])  # the cursor taken before the full load
+        self.assertEqual(patched.monthly.set_index('id').at[11, 'taxes'], 5.0)
+        data = self.store.snapshot()
+        self.assertEqual(self.reads[1], later)
+        self.assertEqual(data.monthly['id'].tolist(), [10, 11, 13, 12])
+        self.assertEqual(data.monthly.set_index('id').at[11, 'taxes'], 5.0)
+        self.assertEqual(self.store.stats, {'full': 1, 'incremental': 2, 'rows': 7})
+        self.assertEqual(first.expenses['taxes'].tolist(), [1.0, 2.0, 3.0])  # earlier snapshots stay valid
+
+    def test_deletes_drop_rows_and_merged_months(self):
+        self.store.snapshot()
+        self.feed = [([self._change('expenses', 'delete', 12), self._change('properties', 'delete', 2)],
+                      self.cursor)]
+        data = self.store.snapshot()
+        self.assertEqual(data.properties['id'].tolist(), [1])
+        self.assertEqual(data.expenses['id'].tolist(), [10, 11])
+        self.assertEqual(data.monthly['id'].tolist(), [10, 11])
+
+    def test_failed_or_expired_feed_and_age_reload_in_full(self):
+        loaded = self.store.snapshot()
+        self.feed = [(None, None)]
+        self.assertIs(self.store.snapshot(), loaded)  # keeps serving the old frames
+        self.store.snapshot()
+        self.assertEqual(self.store.stats['full'], 2)
+        with mock.patch.object(store, 'FULL_RELOAD', -1):
+            self.store.snapshot()
+        self.assertEqual(self.store.stats['full'], 3)
+        self.assertEqual(self.feed, [])
+
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.oak = make_property('Oak Court', units=4)
+        self.elm = make_property('Elm Street', units=0, property_type='High Rise')
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(14):
+                make_expense(self.oak, 2023 + i // 12, i % 12 + 1, amount=i + 0.25)
+            make_expense(self.elm, 2024, 1, amount=3.0)
+
+    def _sync(self, url, params):
+        return self.client.get(url, params).json()
+
+    async def _rows(self, url, params):
+        rows, url = [], f'{url}?{params}'
+        while url:
+            page = (await self.async_client.get(url)).json()
+            rows += page['results']
+            url = page['next']
+        return rows
+
+    async def test_lists_match_sync_endpoints(self):
+        sync_props = await sync_to_async(self._sync)('/api/properties/', {})
+        self.assertEqual(await self._rows('/api/async/properties/', 'page_size=1'), sync_props['results'])
+        for params in ({}, {'category': 'taxes'}, {'per_unit': 1, 'start': '2023-06'}):
+            sync_rows = await sync_to_async(self._sync)('/api/expenses/', {**params, 'page_size': 100})
+            query = '&'.join(f'{k}={v}' for k, v in {**params, 'page_size': 4}.items())
+            self.assertEqual(await self._rows('/api/async/expenses/', query), sync_rows['results'], params)
+        resp = await self.async_client.get('/api/async/properties/?include=expenses')
+        self.assertEqual(resp.status_code, 400)
+
+    async def test_trailing_matches_sync_endpoint(self):
+        for params in ({'window': 3}, {'window': 12, 'per_unit': 1}, {'window': 12, 'end': '2023-12'}):
+            expected = await sync_to_async(self._sync)('/api/expenses/trailing/', params)
+            resp = await self.async_client.get('/api/async/expenses/trailing/', params)
+            self.assertEqual(resp.json(), expected, params)
+
+    async def test_validation_and_conditional_get(self):
+        resp = await self.async_client.get('/api/async/expenses/trailing/', {'window': 5})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('window', resp.json())
+        first = await self.async_client.get('/api/async/properties/')
+        again = await self.async_client.get('/api/async/properties/', headers={'If-None-Match': first['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual((await self.async_client.post('/api/async/properties/')).status_code, 405)
+
+
+@override_settings(IMPORT_WORKERS=0)
+class ImportJobTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=media))
+
+    def _upload(self, kind, rows, **data):
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        upload = SimpleUploadedFile('upload.csv', buf.getvalue().encode(), content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post('/api/imports/', {'kind': kind, 'file': upload, **data})
+        self.assertEqual(resp.status_code, 202, resp.content)
+        self.assertEqual(resp.json()['status'], 'queued')
+        return self.client.get(f"/api/imports/{resp.json()['id']}/").json()
+
+    def test_expense_import_runs_and_reports_progress(self):
+        header = ['property_name', 'units', 'property_type', 'location', 'month', 'year'] + EXPENSE_CATEGORIES
+        job = self._upload('expenses', [
+            header,
+            ['Oak Court', 10, 'Garden', 'Denver', 1, 2024] + [100] * 9,
+            ['Oak Court', 10, 'Garden', 'Denver', 2, 2024] + [200] * 9,
+            ['Oak Court', 10, 'Garden', 'Denver', 13, 2024] + [1] * 9,
+        ])
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual((job['rows_processed'], job['error_count']), (3, 1))
+        self.assertIn('month out of range', job['errors'][0][1])
+        self.assertIsNotNone(job['rows_per_second'])
+        self.assertEqual(job['result']['properties'][0]['count'], 2)
+        prop = Property.objects.get(name='Oak Court')
+        self.assertEqual(prop.expenses.count(), 2)
+        self.assertTrue(ExpenseRollup.objects.filter(property=prop, is_latest=True, month=2).exists())
+        self.assertFalse(ImportJob.objects.get(pk=job['id']).file)
+
+    def test_unit_import_updates_footage(self):
+        prop = make_property(units=2)
+        job = self._upload('units', [
+            ['property_name', 'unit_number', 'square_footage'],
+            ['Oak Court', 1, 400], ['Oak Court', 2, 600], ['Elm Street', 1, 900],
+        ], property=prop.id)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result'], {'created': 2, 'updated': 0})
+        prop.refresh_from_db()
+        self.assertEqual(prop.avg_sqft, 500)
+
+    def test_bad_uploads(self):
+        job = self._upload('expenses', [['name', 'amount'], ['Oak Court', 1]])
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('columns mismatch', job['message'])
+        upload = SimpleUploadedFile('units.csv', b'property_name\n')
+        resp = self.client.post('/api/imports/', {'kind': 'units', 'file': upload})
+        self.assertEqual(resp.status_code, 400)
+
+
+@override_settings(MIDDLEWARE=['api.profiling.ProfilingMiddleware'] + settings.MIDDLEWARE)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        reset_metrics()
+        make_expense(make_property(), 2024, 1)
+
+    def test_server_timing_and_metrics(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 404)
+        self.addCleanup(reload_urls)  # after API_PROFILING is restored
+        self.enterContext(override_settings(API_PROFILING=True))
+        reload_urls()
+        resp = self.client.get('/api/expenses/trailing/', {'window': 3})
+        timing = resp['Server-Timing']
+        self.assertRegex(timing, r'app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+')
+        body = self.client.get('/api/metrics/').content.decode()
+        labels = '{view="ExpenseViewSet.trailing",method="GET",status="200"}'
+        self.assertIn(f'api_request_duration_seconds_count{labels} 1', body)
+        self.assertIn(f'api_response_bytes_total{labels} {len(resp.content)}', body)
+        self.assertRegex(body, r'api_db_queries_total\{view="ExpenseViewSet.trailing".*\} [1-9]')
+
+    def test_render_time_of_cached_viewsets(self):
+        # ConditionalGetMixin stores rendered bodies; rendering must still be timed as render
+        render = JSONRowsRenderer.render
+
+        def slow_render(*args, **kwargs):
+            time.sleep(0.05)
+            return render(*args, **kwargs)
+        caches['responses'].clear()
+        with mock.patch.object(JSONRowsRenderer, 'render', slow_render):
+            resp = self.client.get('/api/expenses/')
+        self.assertIsNotNone(caches['responses'].get(_cache_key(resp.wsgi_request)))
+        render_ms = float(re.search(r'render;dur=([\d.]+)', resp['Server-Timing']).group(1))
+        self.assertGreaterEqual(render_ms, 50)
+        self.assertRegex(self.client.get('/api/expenses/')['Server-Timing'], r'render;dur=0\.0')  # cache hit
+
+    def test_slow_requests_are_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+            PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_MS=0, PROFILING_DIR=tmp,
+        ):
+            self.client.get('/api/properties/')
+            dumps = os.listdir(tmp)
+        self.assertEqual(len(dumps), 1)
+        self.assertIn('PropertyViewSet.list', dumps[0])
+
+    def test_sample_drawn_while_profiling_is_not_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+            PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_MS=0, PROFILING_DIR=tmp,
+        ):
+            with _profiler_lock:  # another request's profiler is running
+                resp = self.client.get('/api/properties/')
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(os.listdir(tmp), [])
+            self.assertFalse(_profiler_lock.locked())
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.prop = make_property()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_expense(self.prop, 2024, 1)
+
+    def test_etag_304_and_invalidation(self):
+        first = self.client.get('/api/expenses/')
+        etag = first['ETag']
+        self.assertTrue(first.has_header('Last-Modified'))
+        again = self.client.get('/api/expenses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        # other query strings and representations get their own tag
+        self.assertNotEqual(self.client.get('/api/expenses/', {'year': 2024})['ETag'], etag)
+        self.assertNotEqual(self.client.get('/api/expenses/', {'format': 'csv'})['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_expense(self.prop, 2024, 2)
+        fresh = self.client.get('/api/expenses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(len(fresh.json()['results']), 2)
+        # a property write changes expense responses too (filters, divisors)
+        with self.captureOnCommitCallbacks(execute=True):
+            Property.objects.get(pk=self.prop.pk).save()
+        self.assertNotEqual(self.client.get('/api/expenses/')['ETag'], fresh['ETag'])
+
+    def test_cached_body_is_served_without_recomputing(self):
+        self.client.get('/api/expenses/trailing/', {'window': 3})
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get('/api/expenses/trailing/', {'window': 3})
+        self.assertEqual(len(ctx.captured_queries), 1)  # version lookup only
+        self.assertEqual(resp.json()[0]['taxes'], 100.0)
+
+    def test_write_replaces_the_cached_body(self):
+        caches['responses'].clear()
+        self.client.get('/api/expenses/trailing/', {'window': 3})
+        with self.captureOnCommitCallbacks(execute=True):
+            make_expense(self.prop, 2024, 2)
+        resp = self.client.get('/api/expenses/trailing/', {'window': 3})
+        self.assertEqual(resp.json()[0]['taxes'], 200.0)
+        self.assertEqual(len(caches['responses']._cache), 1)  # the older generation's body is gone
+
+    def test_one_version_bump_per_resource_and_transaction(self):
+        for month in range(2, 8):
+            make_expense(self.prop, 2024, month)
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/properties/{self.prop.id}/')
+        bumps = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "api_resourceversion"')]
+        self.assertEqual(len(bumps), 2)  # properties and expenses
+
+    def test_response_cache_byte_budget(self):
+        cache = BoundedLocMemCache('test-budget', {'OPTIONS': {'MAX_BYTES': 2500}})
+        self.addCleanup(cache.clear)
+        for key in 'abc':
+            cache.set(key, b'x' * 1000)
+            cache.get('a')  # recently used, so kept
+        self.assertEqual((cache.get('a') is not None, cache.get('b'), cache.get('c') is not None),
+                         (True, None, True))
+
+    def test_bulk_writes_bump_versions(self):
+        etag = self.client.get('/api/units/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/units/bulk/', [
+                {'property': self.prop.id, 'unit_number': 1, 'square_footage': 500},
+            ], format='json')
+        resp = self.client.get('/api/units/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()['results']), 1)
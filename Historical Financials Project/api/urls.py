@@ -1,13 +1,30 @@
 from rest_framework.routers import DefaultRouter
+from django.conf import settings
 from django.urls import path, include
-from .views import PropertyViewSet, ExpenseViewSet, UnitViewSet
+from . import async_views
+from .profiling import metrics_view
+from .views import (
+    PropertyViewSet, ExpenseViewSet, UnitViewSet, AnalyticsViewSet, ImportJobViewSet, ExpenseCategoryViewSet,
+    ChangeFeedViewSet, ExportViewSet,
+)
 
 router = DefaultRouter()
 router.register('properties', PropertyViewSet)
 router.register('expenses', ExpenseViewSet)
 router.register('units',  UnitViewSet)
+router.register('analytics', AnalyticsViewSet, basename='analytics')
+router.register('imports', ImportJobViewSet)
+router.register('expense-categories', ExpenseCategoryViewSet)
+router.register('changes', ChangeFeedViewSet, basename='changes')
+router.register('export', ExportViewSet, basename='export')
 
 
 urlpatterns = [
+    # async read endpoints for the ASGI entry point (api.async_views)
+    path('async/properties/', async_views.properties, name='async-properties'),
+    path('async/expenses/', async_views.expenses, name='async-expenses'),
+    path('async/expenses/trailing/', async_views.trailing, name='async-expenses-trailing'),
     path('', include(router.urls)),
 ]
+if settings.API_PROFILING:
+    urlpatterns.insert(0, path('metrics/', metrics_view, name='metrics'))
@@ -0,0 +1,64 @@
+import threading
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ResourceVersion
+
+RESOURCES = {'Property': 'properties', 'Expense': 'expenses', 'Unit': 'units'}
+
+_state = threading.local()
+
+
+def resource_for(model):
+    return RESOURCES[model.__name__]
+
+
+def touch(resource):
+    """
+    Bump the generation of `resource` when the current transaction commits
+    (immediately under autocommit). Touches within one transaction collapse
+    to a single UPDATE per resource, and the version row is not locked for
+    the length of the write, so concurrent writers don't queue on it. The
+    new generation becomes visible after the data, so no response read
+    from the old data is cached under it.
+    """
+    _state.__dict__.setdefault('pending', set()).add(resource)
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    for resource in sorted(_state.__dict__.pop('pending', ())):
+        _bump(resource)
+
+
+def _bump(resource):
+    now = timezone.now()
+    bumped = ResourceVersion.objects.filter(resource=resource).update(
+        generation=F('generation') + 1, modified_at=now
+    )
+    if not bumped:
+        ResourceVersion.objects.get_or_create(
+            resource=resource, defaults={'generation': 1, 'modified_at': now}
+        )
+
+
+def current(resources):
+    """{resource: (generation, modified_at)} in one query; unwritten resources are (0, None)."""
+    found = {
+        r: (g, m) for r, g, m in
+        ResourceVersion.objects.filter(resource__in=resources)
+        .values_list('resource', 'generation', 'modified_at')
+    }
+    return {r: found.get(r, (0, None)) for r in resources}
+
+
+async def acurrent(resources):
+    """current() for async views, through the async ORM."""
+    found = {
+        r: (g, m) async for r, g, m in
+        ResourceVersion.objects.filter(resource__in=resources)
+        .values_list('resource', 'generation', 'modified_at')
+    }
+    return {r: found.get(r, (0, None)) for r in resources}
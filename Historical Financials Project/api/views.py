@@ -1,21 +1,306 @@
 # api/views.py
 
-from rest_framework import viewsets
+from django.conf import settings
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny
-from .models import Property, Expense, Unit 
-from .serializers import PropertySerializer, ExpenseSerializer, UnitSerializer
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+from .models import EXPENSE_CATEGORIES, Property, Expense, ExpenseCategory, ExpenseRollup, ImportJob, Unit
+from .serializers import (
+    PropertySerializer, PropertyWithExpensesSerializer, ExpenseSerializer, UnitSerializer,
+    NormalizedExpenseSerializer, ImportJobSerializer, WideExpenseSerializer, ExpenseCategorySerializer,
+)
+from .bulk import upsert_expenses, upsert_units
+from .caching import ConditionalGetMixin
+from .analytics import distribution
+from .changes import FEEDS, stream
+from .export import csv_chunks, xlsx_chunks
+from .aggregates import TRAILING_WINDOWS, per_divisor, rollup_totals, trailing_totals
+from .facts import category_amounts, normalized, wide_rows
+from .filters import (
+    EXPENSE_PERIOD_PARAMS, category_list, choice_list, datetime_param, filter_by_property, filter_expenses,
+    filter_modified, filter_properties, id_list, per_param, window_param,
+)
+from .jobs import enqueue
+from .money import CENTS
+from .renderers import (
+    COLUMNAR_FORMATS, COLUMNAR_RENDERERS, ColumnarData, CSVRenderer, JSONRows, JSONRowsRenderer, XLSXRenderer,
+)
 
-class UnitViewSet(viewsets.ModelViewSet):
+EXPENSE_COLUMNS = (
+    [('id', 'int'), ('property', 'int'), ('year', 'int'), ('month', 'int')]
+    + [(k, 'cents') for k in EXPENSE_CATEGORIES]
+)
+# ExpenseSerializer's field order, for the JSON list fast path
+EXPENSE_JSON_FIELDS = (
+    [('id', 'int'), ('month', 'int'), ('year', 'int')]
+    + [(k, 'cents') for k in EXPENSE_CATEGORIES] + [('property', 'int')]
+)
+
+
+def _bulk_rows(request):
+    if not isinstance(request.data, list):
+        raise ValidationError({'non_field_errors': ['Expected a list of objects.']})
+    return request.data
+
+
+def _only(fields, categories):
+    """(column, kind) pairs without the category columns not in `categories`."""
+    return [(name, kind) for name, kind in fields if name not in EXPENSE_CATEGORIES or name in categories]
+
+
+def _includes(params):
+    return {v for value in params.getlist('include') for v in value.split(',') if v}
+
+
+class UnitViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset         = Unit.objects.all()
     serializer_class = UnitSerializer
     permission_classes = [AllowAny]
+    cache_resources = ('units', 'properties')  # property-level filters
+
+    def get_queryset(self):
+        return filter_by_property(super().get_queryset(), self.request.query_params)
 
-class PropertyViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create or update many units in one transaction, keyed on (property, unit_number)."""
+        return Response(upsert_units(_bulk_rows(request)))
+
+class PropertyViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Property.objects.all()
     serializer_class = PropertySerializer
     permission_classes = [AllowAny]        # ← allow anyone
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+    def get_cache_resources(self, request):
+        if 'expenses' in _includes(request.GET):
+            return ('properties', 'expenses')
+        return ('properties',)
+
+    def _with_expenses(self):
+        return 'expenses' in _includes(self.request.query_params)
+
+    def get_queryset(self):
+        params = self.request.query_params
+        qs = filter_modified(filter_properties(super().get_queryset(), params), params)
+        ids = id_list(params, 'id')
+        if ids:
+            qs = qs.filter(pk__in=ids)
+        if self._with_expenses():
+            qs = qs.prefetch_related('expenses')
+        return qs
+
+    def get_serializer_class(self):
+        if self._with_expenses():
+            return PropertyWithExpensesSerializer
+        return super().get_serializer_class()
+
+class ExpenseViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
     permission_classes = [AllowAny]        # ← allow anyone
+    cache_resources = ('expenses', 'properties')  # filters and per-unit/sqft divisors
+    renderer_classes = [JSONRowsRenderer, BrowsableAPIRenderer]
+
+    def _per(self):
+        return per_param(self.request.query_params) if self.action == 'list' else None
+
+    def _categories(self):
+        return category_list(self.request.query_params) if self.action == 'list' else None
+
+    def get_queryset(self):
+        params = self.request.query_params
+        qs = filter_expenses(super().get_queryset(), params)
+        if self.action == 'list':
+            qs = filter_modified(qs, params)
+        per = self._per()
+        if per:
+            qs = qs.annotate(divisor=per_divisor(per))
+        return qs
+
+    def get_serializer_class(self):
+        if self._per():
+            return NormalizedExpenseSerializer
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'categories': self._categories()}
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action == 'list':
+            renderers += [r() for r in COLUMNAR_RENDERERS]
+        return renderers
+
+    def list(self, request, *args, **kwargs):
+        """
+        JSON pages by default. Accept: text/csv, application/vnd.apache.arrow.stream
+        or application/vnd.apache.parquet (or ?format=csv|arrow|parquet) returns
+        every matching row as one columnar body, built straight from value
+        tuples without the per-row serializer. Plain JSON pages skip it too:
+        value rows are formatted by JSONRowsRenderer, cents written directly
+        as dollar literals. ?per_unit=1 or ?per_sqft=1 divides the category
+        amounts in either form; ?category=<name>[,<name>] keeps only those
+        categories (read from the fact rows under normalized storage).
+        ?modified_since=<ISO 8601 datetime> keeps the rows written since then,
+        for clients refreshing a local copy incrementally.
+        """
+        per, categories = self._per(), self._categories()
+        if request.accepted_renderer.format in COLUMNAR_FORMATS:
+            qs = self.filter_queryset(self.get_queryset()).order_by('id')
+            fields, sources = _only(EXPENSE_COLUMNS, categories or EXPENSE_CATEGORIES), None
+            if per:
+                qs = qs.annotate(**{
+                    f'{k}_per': F(k) / F('divisor') / CENTS for k in EXPENSE_CATEGORIES
+                })
+                fields = [(name, 'float' if kind == 'cents' else kind) for name, kind in fields]
+                sources = {k: f'{k}_per' for k in EXPENSE_CATEGORIES}
+            return Response(ColumnarData(qs, fields, sources))
+        if isinstance(request.accepted_renderer, JSONRowsRenderer) and not per:
+            qs = self.filter_queryset(self.get_queryset())
+            if categories and normalized():
+                page = self.paginate_queryset(qs.values('id', 'month', 'year', 'property'))
+                if page is not None:
+                    rows = wide_rows(page, categories)
+                    return self.get_paginated_response(WideExpenseSerializer(rows, many=True).data)
+            fields = _only(EXPENSE_JSON_FIELDS, categories or EXPENSE_CATEGORIES)
+            page = self.paginate_queryset(qs.values(*(name for name, _ in fields)))
+            if page is not None:
+                return self.get_paginated_response(JSONRows(page, fields))
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create or update many expense months in one transaction, keyed on (property, year, month)."""
+        return Response(upsert_expenses(_bulk_rows(request)))
+
+    @action(detail=False, methods=['get'])
+    def trailing(self, request):
+        """
+        T12/T3 category totals, one row per property:
+        ?window=3|12&per_unit=1|per_sqft=1 plus any list filter; with `end` the window ends at that period.
+        Without period filters the figures come straight from the
+        maintained ExpenseRollup rows instead of re-summing expenses.
+        """
+        params = request.query_params
+        window = window_param(params, TRAILING_WINDOWS)
+        per = per_param(params)
+        if any(params.get(p) for p in EXPENSE_PERIOD_PARAMS):
+            rows = trailing_totals(window, expenses=self.get_queryset(), per=per)
+        else:
+            rollups = filter_by_property(ExpenseRollup.objects.all(), params)
+            rows = rollup_totals(window, rollups, per=per)
+        return Response(list(rows))
+
+
+class AnalyticsViewSet(ConditionalGetMixin, viewsets.ViewSet):
+    permission_classes = [AllowAny]
+    cache_resources = ('expenses', 'properties')
+
+    @action(detail=False, methods=['get'])
+    def distribution(self, request):
+        """
+        Box-plot stats (quartiles, whiskers, outliers) of one expense category
+        per property and per property type:
+        ?category=<name>&per_unit=1|per_sqft=1 plus any expense list filter.
+        """
+        params = request.query_params
+        category = params.get('category')
+        if category not in EXPENSE_CATEGORIES:
+            raise ValidationError({'category': f'Must be one of {EXPENSE_CATEGORIES}.'})
+        return Response(distribution(category_amounts(category, params), category, per=per_param(params)))
+
+
+class ChangeFeedViewSet(viewsets.ViewSet):
+    """
+    GET /api/changes/?since=<cursor>: the inserts, updates and deletes of
+    properties, expenses and units since a cursor, streamed in time order
+    (see api.changes). ?resource=expenses,units narrows the feed; without
+    ?since every current row comes as an insert. A cursor older than
+    TOMBSTONE_RETENTION gets 410 Gone, since deletions before it may have
+    been pruned: reload in full and continue from the new cursor.
+
+    The cursor also comes in an X-Changes-Cursor header; a HEAD request
+    returns just that, so a client can take a cursor from the server's
+    clock before a full load.
+    """
+    permission_classes = [AllowAny]
+
+    def list(self, request):
+        params = request.query_params
+        since = datetime_param(params, 'since')
+        resources = choice_list(params, 'resource', list(FEEDS)) or list(FEEDS)
+        now = timezone.now()
+        if since is not None and since < now - settings.TOMBSTONE_RETENTION:
+            return Response({'detail': 'Cursor expired; reload in full.'}, status=status.HTTP_410_GONE)
+        cursor = now - settings.CHANGES_CURSOR_LAG
+        headers = {'X-Changes-Cursor': cursor.isoformat()}
+        if request.method == 'HEAD':
+            return Response(headers=headers)
+        return StreamingHttpResponse(
+            stream(cursor, resources, since), content_type='application/json', headers=headers,
+        )
+
+
+class ExportViewSet(viewsets.ViewSet):
+    """
+    GET /api/export/: every expense month matching the expense list filters
+    (and ?modified_since, ?category=) with its property's name, type,
+    location, units and square footage, as one CSV (the default) or, with
+    ?format=xlsx or an Accept of the XLSX media type, one workbook. The
+    body is streamed from a server-side cursor (see api.export), so an
+    export of the whole history costs the server no more memory than a
+    small one. A workbook is only sent once complete, so XLSX exports of
+    more than EXPORT_XLSX_MAX_ROWS rows get 400; CSV starts at once.
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = [CSVRenderer, XLSXRenderer]
+
+    def list(self, request):
+        params = request.query_params
+        qs = filter_modified(filter_expenses(Expense.objects.all(), params), params)
+        categories = category_list(params)
+        renderer = request.accepted_renderer
+        chunks = csv_chunks
+        if renderer.format == 'xlsx':
+            limit = settings.EXPORT_XLSX_MAX_ROWS
+            if qs[:limit + 1].count() > limit:
+                raise ValidationError({'format': [
+                    f'XLSX exports are limited to {limit:,} rows; narrow the filters or use format=csv.'
+                ]})
+            chunks = xlsx_chunks
+        resp = StreamingHttpResponse(chunks(qs, categories), content_type=renderer.media_type)
+        resp['Content-Disposition'] = f'attachment; filename="expenses.{renderer.format}"'
+        return resp
+
+
+class ExpenseCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+    """The expense category dimension, in display order."""
+    queryset = ExpenseCategory.objects.all()
+    serializer_class = ExpenseCategorySerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    lookup_field = 'key'
+
+
+class ImportJobViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    POST a multipart `file` with kind=expenses (the expense template) or
+    kind=units plus `property` (the unit template); the response is 202
+    with the queued job. GET /imports/<id>/ reports its progress.
+    """
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [AllowAny]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(filename=serializer.validated_data['file'].name)
+        enqueue(job)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
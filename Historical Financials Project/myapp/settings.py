@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project
@@ -81,6 +82,55 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# 'responses' holds rendered API reads, one per URL and Accept header with
+# the ETag they were rendered under (api.caching). In memory it culls a
+# quarter of its entries when full and drops least recently used bodies past
+# RESPONSE_CACHE_BUDGET_BYTES. Set API_RESPONSE_CACHE_DIR to use a
+# file-based cache shared by every worker process on the host.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'api.cache_backends.BoundedLocMemCache',
+        'LOCATION': 'api-responses',
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 500, 'CULL_FREQUENCY': 4,
+            'MAX_BYTES': int(os.environ.get('RESPONSE_CACHE_BUDGET_BYTES', str(64 * 1024 * 1024))),
+        },
+    },
+}
+if os.environ.get('API_RESPONSE_CACHE_DIR'):
+    CACHES['responses'].update(
+        BACKEND='django.core.cache.backends.filebased.FileBasedCache',
+        LOCATION=os.environ['API_RESPONSE_CACHE_DIR'],
+    )
+# Larger bodies (e.g. full columnar exports) still get ETags but are not stored
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(5 * 1024 * 1024)))
+
+# Uploaded import files, kept only until their ImportJob has run
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# /api/export/ workbooks are built in full before the first byte is sent
+# (CSV streams as it goes), so larger XLSX exports are refused
+EXPORT_XLSX_MAX_ROWS = int(os.environ.get('EXPORT_XLSX_MAX_ROWS', '50000'))
+
+# Threads processing ImportJobs (api.jobs); 0 runs each job inline on commit
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', '2'))
+
+# 'normalized' also keeps one ExpenseFact row per expense category (api.facts)
+# so single-category reads scan only that category; run
+# `manage.py rebuild_expense_facts` after switching it on
+EXPENSE_STORAGE = os.environ.get('EXPENSE_STORAGE', 'wide')
+
+# /api/changes/ hands out cursors this many seconds behind its start, so a
+# write stamped earlier but committed during the read is not skipped; the
+# overlap is delivered twice. Tombstones older than TOMBSTONE_RETENTION are
+# pruned (manage.py prune_tombstones) and older cursors must reload in full.
+CHANGES_CURSOR_LAG = timedelta(seconds=float(os.environ.get('CHANGES_CURSOR_LAG', '5')))
+TOMBSTONE_RETENTION = timedelta(days=int(os.environ.get('TOMBSTONE_RETENTION_DAYS', '30')))
+
 # DRF & JWT settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -89,7 +139,18 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Keyset pages ordered by id; clients follow `next` (see utils_api._iter_pages)
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.IdCursorPagination',
 }
 
 # Allow CORS for all origins (dev only)
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Opt-in request profiling (api.profiling): Server-Timing headers, totals at
+# /api/metrics/ (routed only when on), and cProfile dumps for a sampled share of slow requests
+API_PROFILING = os.environ.get('API_PROFILING', '') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))  # 0..1
+PROFILING_SLOW_MS = float(os.environ.get('PROFILING_SLOW_MS', '500'))
+PROFILING_DIR = BASE_DIR / 'profiles'
+if API_PROFILING:
+    MIDDLEWARE.insert(0, 'api.profiling.ProfilingMiddleware')
@@ -1,5 +1,6 @@
 import streamlit as st
 from pages import add_property, view_properties, visualize_data, property_list
+from utils_api import cache_stats
 
 st.set_page_config(page_title="Historical Financials", layout="wide")
 st.title("Historical Financials (API)")
@@ -19,3 +20,9 @@ elif page == "Visualize Data":
     visualize_data.app()
 else:  # Property List
     property_list.app()
+
+stats = cache_stats()
+st.sidebar.caption(
+    f"API cache: {stats['hits']} hits / {stats['misses']} misses ({stats['size']} entries), "
+    f"{stats['not_modified']} revalidated"
+)
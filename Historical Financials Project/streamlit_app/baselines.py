@@ -0,0 +1,25 @@
+"""
+Earlier, row-at-a-time versions of frames.py functions, kept only as the
+baselines that manage.py bench_api times the vectorized code against and
+that the API tests check it with. The pages never import this module.
+"""
+import pandas as pd
+
+import frames
+
+
+def trailing_loop(expenses, props, n, per=None):
+    """
+    The per-property loop view_properties used to run before frames.trailing_sums:
+    re-filter, sort and tail the whole frame once per property.
+    """
+    column = {'unit': 'units', 'sqft': 'avg_sqft'}.get(per)
+    rows = []
+    for _, p in props.iterrows():
+        pe = expenses[expenses['property'] == p['id']].sort_values(['year', 'month']).tail(n)
+        row = {'property': p['id'], 'months': len(pe), **pe[frames.CATEGORY_KEYS].sum().to_dict()}
+        if column:
+            for k in frames.CATEGORY_KEYS:
+                row[k] = row[k] / p[column] if p[column] else None
+        rows.append(row)
+    return pd.DataFrame(rows)
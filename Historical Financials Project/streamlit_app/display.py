@@ -0,0 +1,57 @@
+"""
+Table display shared by the pages. Frames from frames.py stay numeric and
+are formatted in the browser through st.column_config, so a rerun never
+builds a string per cell. Long tables are paged: only the visible page is
+serialized to the frontend, so reruns stay flat as row counts grow.
+"""
+import math
+
+import streamlit as st
+
+from frames import CATEGORY_KEYS, money_format
+
+PAGE_ROWS = 500
+
+LABELS = {
+    'property_name': 'Property', 'units': 'Units', 'property_type': 'Type',
+    'location': 'Location', 'avg_sqft': 'Avg SqFt', 'year': 'Year', 'month': 'Month',
+}
+
+def column_config(df):
+    """Labels and number formats for the columns of a frames.py table."""
+    config = {
+        'units': st.column_config.NumberColumn(LABELS['units'], format="%d"),
+        'avg_sqft': st.column_config.NumberColumn(LABELS['avg_sqft'], format="%,.1f"),
+        'year': st.column_config.NumberColumn(LABELS['year'], format="%d"),
+        'month': st.column_config.NumberColumn(LABELS['month'], format="%d"),
+    }
+    for k in CATEGORY_KEYS:
+        if k in df:
+            config[k] = st.column_config.NumberColumn(
+                k.replace('_', ' ').title(), format=money_format(df[k])
+            )
+    for k in ('property_name', 'property_type', 'location'):
+        config[k] = st.column_config.TextColumn(LABELS[k])
+    return {k: v for k, v in config.items() if k in df}
+
+def show_table(df, config=None):
+    st.dataframe(
+        df, column_config=config or column_config(df),
+        width="stretch", hide_index=True,
+    )
+
+def paged_table(df, key, page_rows=PAGE_ROWS):
+    """
+    show_table for one `page_rows` slice of `df` with a page picker. The
+    number formats come from the whole frame so they don't change per page.
+    """
+    pages = max(1, math.ceil(len(df) / page_rows))
+    page = 1
+    if pages > 1:
+        # keyed on the page count, so a filter that shrinks the table starts over at page 1
+        page = st.number_input(f"Page (of {pages:,})", 1, pages, 1, key=f"{key}_page_{pages}")
+    start = (page - 1) * page_rows
+    end = min(start + page_rows, len(df))
+    show_table(df.iloc[start:end], column_config(df))
+    if pages > 1:
+        st.caption(f"Rows {start + 1:,}–{end:,} of {len(df):,}")
@@ -0,0 +1,156 @@
+"""
+DataFrame shaping shared by the pages. Kept free of Streamlit calls so the
+benchmark suite (manage.py bench_api) can time the same code the pages run.
+Frames keep numeric dtypes; display.py formats them in the browser.
+"""
+import pandas as pd
+
+# the client's one copy of the category keys, in the order of the server's
+# ExpenseCategory dimension (/api/expense-categories/)
+CATEGORY_KEYS = [
+    'payroll','marketing','admin','maintenance',
+    'turnover','utilities','taxes','insurance','management_fees'
+]
+PROPERTY_COLUMNS = ['property_name','units','property_type','location','avg_sqft']
+# /properties/ row fields and the dtypes property_frame gives them
+PROPERTY_FIELDS = ['id','name','units','property_type','location','total_sqft','avg_sqft']
+EXPENSE_FIELDS = ['id','property','year','month'] + CATEGORY_KEYS
+PROPERTY_DTYPES = {'id':'int64','units':'int64','total_sqft':'float64','avg_sqft':'float64'}
+
+def money_format(values):
+    """
+    printf format for a column of dollar amounts: cents when every value
+    is small (per-unit / per-sqft figures), whole dollars otherwise. One
+    vectorized max per column instead of a string per cell.
+    """
+    largest = values.abs().max()
+    return "$%,.2f" if pd.isna(largest) or largest < 100 else "$%,.0f"
+
+def trailing_summary(props, sums, fill_missing=True):
+    """
+    One display row per property in `props` (property_name, units, ...,
+    avg_sqft, id) with its trailing-window category sums from `sums`
+    (rows of /expenses/trailing/). Properties without expenses get zeros
+    when `fill_missing`, else NaN. Columns stay numeric; the pages format
+    them with display.column_config.
+    """
+    df = props[['id'] + PROPERTY_COLUMNS].merge(
+        sums[['property'] + CATEGORY_KEYS], left_on='id', right_on='property', how='left'
+    ).drop(columns=['id','property'])
+    if fill_missing:
+        df[CATEGORY_KEYS] = df[CATEGORY_KEYS].fillna(0)
+    return df
+
+def trailing_sums(expenses, props, n, per=None):
+    """
+    Trailing-window category sums of every property in one pass: sort the
+    monthly `expenses` frame (property, year, month, categories) once,
+    keep each property's last `n` months with groupby().tail(n) and sum
+    them per group. `per` is None, 'unit' or 'sqft'; the divisor is the
+    property's `units` or `avg_sqft` from `props` (zero or missing gives
+    NaN). Rows match /expenses/trailing/ (property, months, categories), so
+    the result feeds trailing_summary like the server's.
+    """
+    latest = (
+        expenses.sort_values(['property','year','month'])
+        .groupby('property', sort=False).tail(n)
+    )
+    grouped = latest.groupby('property')
+    sums = grouped[CATEGORY_KEYS].sum()
+    sums.insert(0, 'months', grouped.size())
+    if per:
+        divisor = _divisor(props.set_index('id').reindex(sums.index), per)
+        sums[CATEGORY_KEYS] = sums[CATEGORY_KEYS].div(divisor, axis=0)
+    return sums.reset_index()
+
+def _divisor(frame, per):
+    """The `units` ('unit') or `avg_sqft` ('sqft') column as floats, zero as NaN."""
+    values = frame['units' if per == 'unit' else 'avg_sqft'].astype(float)
+    return values.where(values != 0)
+
+def property_frame(rows):
+    """Typed property frame from /properties/ rows (name as property_name)."""
+    df = pd.DataFrame(rows, columns=PROPERTY_FIELDS).rename(columns={'name':'property_name'})
+    return df.astype(PROPERTY_DTYPES)
+
+def expense_frame(expenses=None):
+    """
+    Typed expense months from a columnar /expenses/ frame (none: an empty
+    one), with a `period` column (first day of the month) derived once here
+    instead of on every rerun.
+    """
+    if expenses is None:
+        expenses = pd.DataFrame(columns=EXPENSE_FIELDS)
+    df = expenses.astype({'id':'int64','property':'int64','year':'int64','month':'int64',
+                          **{k:'float64' for k in CATEGORY_KEYS}})
+    df['period'] = pd.to_datetime(df[['year','month']].assign(day=1))
+    return df
+
+def upsert(frame, rows, key='id'):
+    """
+    `frame` with `rows` folded in by `key`: rows already present are
+    overwritten by position, keeping their order, and new keys are
+    appended at the end.
+    """
+    if rows.empty:
+        return frame
+    if frame.empty:
+        return rows.reset_index(drop=True)
+    pos = pd.Index(frame[key]).get_indexer(rows[key])
+    found = pos >= 0
+    patched = {}
+    for c in rows.columns:
+        values = frame[c].to_numpy(copy=True)
+        values[pos[found]] = rows[c].to_numpy()[found]
+        patched[c] = values
+    frame = frame.assign(**patched)
+    if found.all():
+        return frame
+    return pd.concat([frame, rows[~found]], ignore_index=True)
+
+def remove(frame, ids, key='id'):
+    """`frame` without the rows whose `key` is in `ids`."""
+    if not ids:
+        return frame
+    return frame[~frame[key].isin(ids)].reset_index(drop=True)
+
+def merge_monthly(expenses, props):
+    """
+    Expense months joined to their property's columns, sorted by property
+    and period: the pre-merged frame the pages slice and normalize.
+    """
+    merged = expenses.merge(
+        props[['id'] + PROPERTY_COLUMNS].rename(columns={'id':'property'}), on='property', how='inner'
+    )
+    return merged.sort_values(['property','period'], ignore_index=True)
+
+def patch_amounts(monthly, changed):
+    """
+    A merge_monthly frame with the category amounts of the `changed`
+    expense rows written over the same months, leaving every other column
+    shared. None when a row in `changed` is new or moved to another
+    property or month; those need a fresh merge_monthly.
+    """
+    pos = pd.Index(monthly['id']).get_indexer(changed['id'])
+    if (pos < 0).any():
+        return None
+    keys = ['property','year','month']
+    if not (monthly[keys].to_numpy()[pos] == changed[keys].to_numpy()).all():
+        return None
+    patched = {}
+    for k in CATEGORY_KEYS:
+        values = monthly[k].to_numpy(copy=True)
+        values[pos] = changed[k].to_numpy()
+        patched[k] = values
+    return monthly.assign(**patched)
+
+def monthly_view(monthly, per=None):
+    """
+    Display rows of a merge_monthly frame. `per` ('unit' or 'sqft') divides
+    the categories by the row's units or avg_sqft like the API's ?per_unit /
+    ?per_sqft (zero or missing gives NaN).
+    """
+    df = monthly[PROPERTY_COLUMNS + ['year','month'] + CATEGORY_KEYS]
+    if per:
+        df = df.assign(**df[CATEGORY_KEYS].div(_divisor(df, per), axis=0))
+    return df
@@ -0,0 +1,50 @@
+import time
+import pandas as pd
+import streamlit as st
+from utils_api import clear_cache, get_import
+
+# Seconds between status requests while a job runs
+POLL_INTERVAL = 0.5
+
+def watch_import(job_id):
+    """
+    Poll an import job until it finishes, drawing a progress bar, and
+    return the final job (None if it cannot be read). The work happens on
+    the server, so a rerun or browser refresh simply resumes watching.
+    """
+    bar = st.progress(0.0, text="Waiting for the import to start…")
+    while True:
+        job = get_import(job_id)
+        if job is None:
+            bar.empty()
+            return None
+        if job['status'] in ('done', 'failed'):
+            break
+        done, total = job['rows_processed'], job['total_rows']
+        rate = f" ({job['rows_per_second']:,.0f} rows/s)" if job['rows_per_second'] else ""
+        if total:
+            bar.progress(min(done / total, 1.0), text=f"Imported {done:,} of {total:,} rows{rate}")
+        else:
+            bar.progress(0.0, text=f"Imported {done:,} rows{rate}")
+        time.sleep(POLL_INTERVAL)
+
+    if job['status'] == 'failed':
+        bar.empty()
+        st.error(job['message'])
+    else:
+        bar.progress(1.0, text=f"Imported {job['rows_processed']:,} rows")
+    # the job wrote behind the read cache's back; drop it once per job
+    seen = st.session_state.setdefault('finished_imports', set())
+    if job['id'] not in seen:
+        seen.add(job['id'])
+        clear_cache()
+    return job
+
+def show_errors(job):
+    if job['error_count']:
+        st.error(f"{job['error_count']} rows could not be imported.")
+        with st.expander("Show import errors"):
+            st.dataframe(
+                pd.DataFrame(job['errors'], columns=['row', 'error']),
+                use_container_width=True
+            )
@@ -2,13 +2,10 @@ import streamlit as st
 import pandas as pd
 import io
 import datetime
-from utils_api import add_property, add_expense
+from utils_api import add_property, add_expenses, start_import
+from import_progress import show_errors, watch_import
+from frames import CATEGORY_KEYS
 
-
-CATEGORY_KEYS = [
-    'payroll','marketing','admin','maintenance',
-    'turnover','utilities','taxes','insurance','management_fees'
-]
 MONTHS = [
     'January','February','March','April','May','June',
     'July','August','September','October','November','December'
@@ -37,59 +34,30 @@ def app():
     st.markdown("---")
 
     # --- Upload filled template ---
-    uploaded = st.file_uploader("Upload filled Excel template", type=['xlsx'])
-    if uploaded:
-        try:
-            df = pd.read_excel(uploaded, sheet_name='Expenses')
-        except Exception:
-            st.error("Unable to read 'Expenses' sheet. Please use the provided template.")
-            return
-        expected = ['property_name','units','property_type','location','month','year'] + CATEGORY_KEYS
-        if not all(c in df.columns for c in expected):
-            st.error("Template columns mismatch. Do not rename headers.")
+    # The server imports the file in the background; the job id lives in
+    # the URL so a refresh keeps following the same job.
+    uploaded = st.file_uploader("Upload filled Excel template", type=['xlsx','csv'])
+    if uploaded and st.session_state.get('expense_upload') != uploaded.file_id:
+        job = start_import('expenses', uploaded)
+        if job is None:
             return
+        st.session_state.expense_upload = uploaded.file_id
+        st.query_params['import_job'] = job['id']
 
-        # Handle multiple distinct properties
-        props = df[['property_name','units','property_type','location']].drop_duplicates()
-        for _, p in props.iterrows():
-            # Create the property
-            prop_data = {
-                'name': p['property_name'],
-                'units': int(p['units']),
-                'property_type': p['property_type'],
-                'location': p['location']
-            }
-            prop = add_property(prop_data)
-            if not prop:
-                st.error(f"Failed to create property {p['property_name']}")
-                continue
-
-            # Filter expenses for this property
-            mask = (
-                (df.property_name == p['property_name']) &
-                (df.units == p['units']) &
-                (df.property_type == p['property_type']) &
-                (df.location == p['location'])
-            )
-            this_rows = df[mask]
-
-            # Add expense entries
-            count = 0
-            for _, row in this_rows.iterrows():
-                exp_payload = {
-                    'property': prop['id'],
-                    'month': int(row['month']),
-                    'year': int(row['year']),
-                    **{k: float(row[k]) for k in CATEGORY_KEYS}
-                }
-                res = add_expense(exp_payload)
-                if res:
-                    count += 1
-
-            st.success(
-                f"Added property '{prop['name']}' with {count} expense entries."
-            )
-        return
+    job_id = st.query_params.get('import_job')
+    if job_id:
+        job = watch_import(job_id)
+        if job and job['status'] == 'done':
+            for prop in job['result']['properties']:
+                st.success(
+                    f"Added property '{prop['name']}' with {prop['count']} expense entries."
+                )
+            show_errors(job)
+        if not uploaded and st.button("Dismiss import report"):
+            del st.query_params['import_job']
+            st.rerun()
+        if uploaded:
+            return
 
     # --- Manual entry form ---
     st.info("Or fill manually below:")
@@ -124,7 +92,6 @@ def app():
                 'location': location
             })
             if prop:
-                for e in entries:
-                    add_expense({ 'property': prop['id'], **e })
+                add_expenses([{ 'property': prop['id'], **e } for e in entries])
                 st.success(f"Property '{name}' and manual entries added.")
 
@@ -2,38 +2,28 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 
-from utils_api import get_properties, get_expenses
-
-CATEGORY_KEYS = [
-    'payroll','marketing','admin','maintenance',
-    'turnover','utilities','taxes','insurance','management_fees'
-]
+from utils_api import get_distribution
+from frames import CATEGORY_KEYS
 
 def app():
     st.header("Visualize Expenses")
-    props=get_properties()
-    exps=get_expenses()
-    if not props or not exps:
-        st.info('Not enough data.')
-        return
-    dfp=pd.DataFrame(props)
-    dfe=pd.DataFrame(exps)
-    merged=dfe.merge(dfp,left_on='property',right_on='id')
-    merged['period']=pd.to_datetime(dict(year=merged.year,month=merged.month,day=1))
-    st.sidebar.subheader('Unit Info (CSV)')
-    uf=st.sidebar.file_uploader("Upload CSV with 'property_name','average_sqft'",type=['csv'])
-    if uf:
-        ui=pd.read_csv(uf)
-        merged=merged.merge(ui,on='property_name',how='left')
-        for k in CATEGORY_KEYS: merged[f"{k}_per_sqft"]=merged[k]/merged['average_sqft']
     st.subheader('Box-and-Whiskers Plot')
     cat=st.selectbox('Expense Category',CATEGORY_KEYS)
-    per_sqft=uf and st.checkbox('Plot per sqft')
-    field=f"{cat}_per_sqft" if per_sqft else cat
-    ylabel=f"{cat.replace('_',' ').title()}{' per sqft' if per_sqft else ''}"
-    chart=alt.Chart(merged).mark_boxplot(extent=1.5).encode(
-        x=alt.X('property_name:N',title='Property'),
-        y=alt.Y(f'{field}:Q',title=ylabel)
-    ).properties(width=600,height=400)
+    norm=st.radio('Normalize',['Total','Per unit','Per sqft'],horizontal=True)
+    by_type=st.checkbox('Group by property type')
+    # quartiles/whiskers/outliers are computed by the API; only stats are sent
+    dist=get_distribution(cat,per_unit=norm=='Per unit',per_sqft=norm=='Per sqft')
+    stats=pd.DataFrame(dist['property_types' if by_type else 'properties'])
+    if stats.empty:
+        st.info('Not enough data.')
+        return
+    xfield,xtitle=('property_type','Property Type') if by_type else ('name','Property')
+    ylabel=f"{cat.replace('_',' ').title()}{'' if norm=='Total' else ' '+norm.lower()}"
+    base=alt.Chart(stats).encode(x=alt.X(f'{xfield}:N',title=xtitle))
+    whiskers=base.mark_rule().encode(y=alt.Y('lower_whisker:Q',title=ylabel),y2='upper_whisker:Q')
+    boxes=base.mark_bar(size=20).encode(y='q1:Q',y2='q3:Q')
+    medians=base.mark_tick(color='white',size=20).encode(y='median:Q')
+    points=stats[[xfield,'outliers']].explode('outliers').dropna()
+    outliers=alt.Chart(points).mark_point().encode(x=f'{xfield}:N',y='outliers:Q')
+    chart=(whiskers+boxes+medians+outliers).properties(width=600,height=400)
     st.altair_chart(chart,use_container_width=True)
-
@@ -0,0 +1,120 @@
+"""
+Portfolio data shared by the pages: the property list and every expense
+month as typed frames (frames.property_frame / expense_frame) plus the
+pre-merged monthly frame (frames.merge_monthly), held by one store per
+process (st.cache_resource), so reruns and page switches reuse them.
+
+A full load takes the feed's current cursor from the server, then
+downloads both tables. After that each refresh reads the API's change feed
+(/api/changes/) from the last cursor and applies the inserts, updates and
+deletes, so a refresh costs time in proportion to what changed. An expired
+cursor or a failed call makes the next refresh a full load, and so does
+every STORE_FULL_RELOAD seconds: the feed misses a write that commits long
+after it was stamped, and the reload reconciles it.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+import streamlit as st
+
+import frames
+from utils_api import EXPENSE_FORMAT, get_changes, get_changes_cursor, get_modified
+
+# seconds between full reloads, which pick up writes the feed skipped
+FULL_RELOAD = float(os.getenv("STORE_FULL_RELOAD", "900"))
+RESOURCES = ['properties', 'expenses']
+
+Portfolio = namedtuple('Portfolio', 'properties expenses monthly')
+
+
+class PortfolioStore:
+    """
+    Frames are replaced, never modified in place, so a snapshot handed to
+    one session stays valid while another refreshes; callers must not
+    mutate them either.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        props, expenses = frames.property_frame([]), frames.expense_frame()
+        self._data = Portfolio(props, expenses, frames.merge_monthly(expenses, props))
+        self._cursor = None
+        self._seen = set()
+        self._loaded_at = None
+        self.stats = {'full': 0, 'incremental': 0, 'rows': 0}
+
+    def snapshot(self):
+        """The current frames, refreshed from the API first."""
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > FULL_RELOAD:
+                self._load()
+            else:
+                self._sync()
+            return self._data
+
+    def _load(self):
+        # the cursor comes first: writes racing the download come again in the feed
+        cursor = get_changes_cursor()
+        if cursor is None:
+            return
+        props, _ = get_modified('properties')
+        expenses, _ = get_modified('expenses', fmt=EXPENSE_FORMAT)
+        if props is None or expenses is None:
+            return
+        props, expenses = frames.property_frame(props), frames.expense_frame(expenses)
+        self._data = Portfolio(props, expenses, frames.merge_monthly(expenses, props))
+        self._cursor = cursor
+        self._seen = set()
+        self._loaded_at = time.monotonic()
+        self.stats['full'] += 1
+        self.stats['rows'] += len(props) + len(expenses)
+
+    def _sync(self):
+        changes, cursor = get_changes(self._cursor, RESOURCES)
+        if changes is None:
+            self._loaded_at = None  # expired cursor or failed call: reload in full next time
+            return
+        self._cursor = cursor
+        # the feed repeats its last few seconds; apply each row's latest change once
+        latest = {(c['resource'], c['id']): c for c in changes}
+        seen = {(r, i, c['at']) for (r, i), c in latest.items()}
+        fresh = [c for (r, i), c in latest.items() if (r, i, c['at']) not in self._seen]
+        self._seen = seen
+        if not fresh:
+            return
+
+        def rows(resource):
+            return [c['data'] for c in fresh if c['resource'] == resource and c['op'] != 'delete']
+
+        def deleted(resource):
+            return {c['id'] for c in fresh if c['resource'] == resource and c['op'] == 'delete'}
+
+        old = self._data
+        changed_props = frames.property_frame(rows('properties'))
+        changed = frames.expense_frame(pd.DataFrame(rows('expenses'), columns=frames.EXPENSE_FIELDS))
+        gone_props, gone = deleted('properties'), deleted('expenses')
+        all_props = frames.upsert(frames.remove(old.properties, gone_props), changed_props)
+        all_expenses = frames.upsert(frames.remove(old.expenses, gone), changed)
+        # rewritten amounts (the usual bulk upsert) are patched in; new, moved
+        # or deleted months and property changes, whose units / avg_sqft feed
+        # every merged row, are merged afresh
+        monthly = None
+        if changed_props.empty and not gone_props and not gone:
+            monthly = frames.patch_amounts(old.monthly, changed)
+        if monthly is None:
+            monthly = frames.merge_monthly(all_expenses, all_props)
+        self._data = Portfolio(all_props, all_expenses, monthly)
+        self.stats['incremental'] += 1
+        self.stats['rows'] += len(fresh)
+
+
+@st.cache_resource
+def _store():
+    return PortfolioStore()
+
+
+def portfolio():
+    """The shared Portfolio (properties, expenses, monthly), synced with the API."""
+    return _store().snapshot()
@@ -1,44 +1,486 @@
+import copy
+import io
+import logging
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.utils import parsedate_to_datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+try:
+    import pyarrow as pa
+except ImportError:  # columnar loads fall back to CSV
+    pa = None
+
+logger = logging.getLogger(__name__)
 
 # Base URL for your Django API
 API_BASE = os.getenv("API_BASE", "http://127.0.0.1:8000/api")
 
+# (connect, read) timeouts in seconds for every API call
+REQUEST_TIMEOUT = (
+    float(os.getenv("API_CONNECT_TIMEOUT", "3.05")),
+    float(os.getenv("API_READ_TIMEOUT", "30")),
+)
+
+def _make_session():
+    """
+    One keep-alive connection pool shared by all sessions. Only idempotent
+    GETs are retried, with exponential backoff, on connection errors and
+    transient 5xx responses.
+    """
+    retry = Retry(
+        total=3, backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({'GET'}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+_session = _make_session()
+
+def _get(url, **kwargs):
+    """
+    GET with revalidation: if an earlier response to the same URL and params
+    carried an ETag, send If-None-Match and, on 304 Not Modified, hand back
+    that stored response (body included) instead of downloading it again.
+    """
+    key = _cache_key(url, kwargs.get('params'))
+    found, stored = _validated.get(key)
+    if found:
+        kwargs['headers'] = {**kwargs.get('headers', {}), 'If-None-Match': stored.headers['ETag']}
+    resp = _send('get', url, **kwargs)
+    if resp is None:
+        return None
+    if resp.status_code == 304 and found:
+        _revalidated['count'] += 1
+        reused = copy.copy(stored)
+        reused.rtt, reused.not_modified = resp.rtt, True
+        return reused
+    if resp.status_code == 200:
+        if 'ETag' in resp.headers and len(resp.content) <= VALIDATED_MAX_BYTES:
+            _validated.set(key, resp)
+        elif found:
+            _validated.discard(key)  # superseded by a response not kept
+    return resp
+
+def _post(url, **kwargs):
+    return _send('post', url, **kwargs)
+
+def _send(method, url, **kwargs):
+    """Issue a request on the pooled session; None (and an error shown) if it never completes."""
+    start = time.perf_counter()
+    try:
+        resp = _session.request(method, url, timeout=REQUEST_TIMEOUT, **kwargs)
+    except requests.RequestException as e:
+        st.error(f"API unreachable: {e}")
+        return None
+    resp.rtt = time.perf_counter() - start  # body included, unlike resp.elapsed
+    return resp
+
+# Rows per request for the /bulk/ endpoints
+BULK_CHUNK = 1000
+
+# Wire format for DataFrame expense loads: arrow, parquet or csv
+EXPENSE_FORMAT = os.getenv("API_EXPENSE_FORMAT", "arrow" if pa is not None else "csv")
+
+# Read cache shared by every Streamlit session in this process
+CACHE_TTL  = float(os.getenv("API_CACHE_TTL", "60"))    # seconds
+CACHE_SIZE = int(os.getenv("API_CACHE_SIZE", "256"))    # entries
+
+class _TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    With `maxbytes`, the least recently used entries are also dropped while
+    the values' total `sizeof` exceeds it. Streamlit runs each session in
+    its own thread, hence the lock.
+    """
+    def __init__(self, ttl, maxsize, maxbytes=None, sizeof=len):
+        self.ttl, self.maxsize = ttl, maxsize
+        self.maxbytes, self.sizeof = maxbytes, sizeof
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.bytes = 0
+
+    def _pop(self, key=None):
+        entry = self._data.pop(key) if key is not None else self._data.popitem(last=False)[1]
+        self.bytes -= entry[2]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                self._pop(key)
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.maxbytes else 0
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, size)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes and self.bytes > self.maxbytes):
+                self._pop()
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data),
+                    'bytes': self.bytes, 'ttl': self.ttl, 'maxsize': self.maxsize}
+
+_cache = _TTLCache(CACHE_TTL, CACHE_SIZE)
+
+# Last ETag-bearing response per GET, for If-None-Match revalidation once a
+# _cache entry has expired; the server's ETag decides freshness, not a TTL.
+# A new response replaces its URL's entry; bodies over VALIDATED_MAX_BYTES
+# are not kept, and all of them together stay under VALIDATED_BUDGET_BYTES
+VALIDATED_MAX_BYTES = int(os.getenv("API_VALIDATED_MAX_BYTES", str(20 * 1024 * 1024)))
+VALIDATED_BUDGET_BYTES = int(os.getenv("API_VALIDATED_BUDGET_BYTES", str(64 * 1024 * 1024)))
+_validated = _TTLCache(float('inf'), CACHE_SIZE, VALIDATED_BUDGET_BYTES, lambda resp: len(resp.content))
+_revalidated = {'count': 0}
+
+def cache_stats():
+    """Hit/miss counters for the shared read cache, plus 304 revalidations."""
+    return {**_cache.stats(), 'not_modified': _revalidated['count']}
+
+def clear_cache():
+    _cache.clear()
+
+def _cache_key(path, params):
+    items = []
+    for k, v in sorted((params or {}).items()):
+        if isinstance(v, (list, tuple, set)):
+            v = tuple(sorted(str(x) for x in v))
+        items.append((k, v))
+    return path, tuple(items)
+
+def _cached(path, params, fetch):
+    """
+    Return fetch() through the shared cache, keyed by endpoint and params.
+    Failed fetches (None) are not cached. Cached values are shared between
+    sessions and must not be mutated by callers.
+    """
+    key = _cache_key(path, params)
+    found, value = _cache.get(key)
+    if found:
+        return value
+    value = fetch()
+    if value is not None:
+        _cache.set(key, value)
+    return value
+
+_APP_TIMING = re.compile(r'(?:^|,)\s*app;dur=([\d.]+)')
+
+def _log_timing(resp):
+    """
+    Log the client round trip next to the server's own time (the app entry
+    of its Server-Timing header, present when the API runs with
+    API_PROFILING=1); the difference is network and queueing cost.
+    """
+    rtt = getattr(resp, 'rtt', resp.elapsed.total_seconds()) * 1000
+    match = _APP_TIMING.search(resp.headers.get('Server-Timing', ''))
+    if getattr(resp, 'not_modified', False):
+        logger.info("%s %s 304: %.1f ms round trip, reused %d cached bytes",
+                    resp.request.method, resp.url, rtt, len(resp.content))
+    elif match:
+        server = float(match.group(1))
+        logger.info("%s %s %s: %.1f ms round trip, %.1f ms server, %.1f ms network, %d bytes",
+                    resp.request.method, resp.url, resp.status_code, rtt, server,
+                    rtt - server, len(resp.content))
+    else:
+        logger.info("%s %s %s: %.1f ms round trip, %d bytes",
+                    resp.request.method, resp.url, resp.status_code, rtt, len(resp.content))
+
 # Helper to handle API responses and errors
-def _handle_response(resp):
+def _handle_response(resp, parse=None):
+    if resp is None:  # transport failure, already reported by _send
+        return None
+    _log_timing(resp)
     try:
         resp.raise_for_status()
-        return resp.json()
+        return parse(resp) if parse else resp.json()
     except Exception as e:
         st.error(f"API error: {e} - {resp.text}")
         return None
 
+def _invalidate(result):
+    """Drop cached reads after a successful write; passes `result` through."""
+    if result is not None:
+        _cache.clear()
+    return result
+
+def _post_bulk(path, rows):
+    """
+    POST `rows` to /<path>/bulk/ in BULK_CHUNK sized batches and merge the
+    per-batch summaries. Result indexes refer to positions in `rows`.
+    Returns None if any batch fails outright.
+    """
+    summary = {'created': 0, 'updated': 0, 'duplicate': 0, 'error': 0, 'results': []}
+    for start in range(0, len(rows), BULK_CHUNK):
+        resp = _post(f"{API_BASE}/{path}/bulk/", json=rows[start:start + BULK_CHUNK])
+        body = _handle_response(resp)
+        if body is None:
+            return None
+        for k in ('created', 'updated', 'duplicate', 'error'):
+            summary[k] += body[k]
+        summary['results'] += [{**r, 'index': r['index'] + start} for r in body['results']]
+    return summary
+
+def _pages(path, params=None):
+    """
+    Yield each page of rows from a cursor-paginated list endpoint,
+    following `next` links; yields None and stops if a request fails.
+    """
+    url = f"{API_BASE}/{path}/"
+    while url:
+        body = _handle_response(_get(url, params=params))
+        if body is None:
+            yield None
+            return
+        if isinstance(body, list):  # unpaginated response
+            yield body
+            return
+        yield body['results']
+        # `next` already carries the original query string
+        url, params = body.get('next'), None
+
+def _iter_pages(path, params=None):
+    """Yield rows lazily from a list endpoint (uncached)."""
+    for page in _pages(path, params):
+        if page is None:
+            return
+        yield from page
+
+def _get_all(path, params=None):
+    """Every row of a list endpoint as a list, through the read cache."""
+    def fetch():
+        rows = []
+        for page in _pages(path, params):
+            if page is None:
+                return None
+            rows.extend(page)
+        return rows
+    return _cached(path, params, fetch) or []
+
+def _read_frame(fmt):
+    def parse(resp):
+        body = io.BytesIO(resp.content)
+        if fmt == 'arrow':
+            return pa.ipc.open_stream(body).read_pandas()
+        if fmt == 'parquet':
+            return pd.read_parquet(body)
+        return pd.read_csv(body)
+    return parse
+
+def _get_frame(path, params, fmt):
+    """A whole list endpoint as one columnar body, parsed into a DataFrame (cached)."""
+    def fetch():
+        resp = _get(f"{API_BASE}/{path}/", params={**params, 'format': fmt})
+        return _handle_response(resp, parse=_read_frame(fmt))
+    frame = _cached(f"{path}.{fmt}", params, fetch)
+    return frame if frame is not None else pd.DataFrame()
+
+def _last_modified(resp):
+    value = resp.headers.get('Last-Modified')
+    return parsedate_to_datetime(value) if value else None
+
+def get_modified(path, since=None, fmt=None):
+    """
+    Rows of a list endpoint written at or after `since` (an aware datetime;
+    every row when None), uncached but revalidated by ETag. With `fmt` the
+    body is one columnar frame, else the JSON pages are collected into a
+    list. Returns (rows, last_modified): the response's Last-Modified, the
+    cursor for the next call, comes from the first page so writes racing
+    the download are fetched again later. An incremental query answered
+    with 304 comes back empty: the caller already has those rows.
+    (None, None) if a request fails.
+    """
+    params = {'modified_since': since.isoformat()} if since else {}
+    url = f"{API_BASE}/{path}/"
+    if fmt:
+        resp = _get(url, params={**params, 'format': fmt})
+        frame = _handle_response(resp, parse=_read_frame(fmt))
+        if frame is None:
+            return None, None
+        if since and getattr(resp, 'not_modified', False):
+            frame = frame.iloc[:0]
+        return frame, _last_modified(resp)
+    rows, stamp, fresh = [], None, False
+    while url:
+        resp = _get(url, params=params)
+        body = _handle_response(resp)
+        if body is None:
+            return None, None
+        if stamp is None:
+            stamp = _last_modified(resp)
+        fresh = fresh or not getattr(resp, 'not_modified', False)
+        rows.extend(body['results'])
+        url, params = body.get('next'), None
+    return (rows if fresh or not since else []), stamp
+
+def get_changes(since=None, resources=None):
+    """
+    /api/changes/ since `since` (an aware datetime; None for a snapshot of
+    every row): (changes, cursor) with the inserts, updates and deletes in
+    time order and the cursor for the next call. Never cached. (None, None)
+    if the call fails or the cursor has expired (410); reload in full then.
+    """
+    params = {}
+    if since:
+        params['since'] = since.isoformat()
+    if resources:
+        params['resource'] = ','.join(resources)
+    resp = _send('get', f"{API_BASE}/changes/", params=params)
+    if resp is not None and resp.status_code == 410:
+        return None, None
+    body = _handle_response(resp)
+    if body is None:
+        return None, None
+    return body['changes'], datetime.fromisoformat(body['cursor'])
+
+def get_changes_cursor():
+    """
+    The change feed's cursor for "now" by the server's clock (HEAD
+    /api/changes/), to take before a full load; None if the call fails.
+    """
+    resp = _send('head', f"{API_BASE}/changes/")
+    cursor = _handle_response(resp, parse=lambda r: r.headers['X-Changes-Cursor'])
+    return datetime.fromisoformat(cursor) if cursor else None
+
+# List filters accepted by the API (see api/filters.py): property (ids),
+# property_type, location, units_min, units_max and, for expenses, year,
+# month, start/end ('YYYY-MM'). Lists are sent as repeated params.
+
+def _normalized(params, per_unit=False, per_sqft=False):
+    """Add the server-side per_unit / per_sqft normalization flags."""
+    if per_unit:
+        params['per_unit'] = 'true'
+    if per_sqft:
+        params['per_sqft'] = 'true'
+    return params
+
 # Property endpoints
-def get_properties():
-    resp = requests.get(f"{API_BASE}/properties/")
-    return _handle_response(resp) or []
+def iter_properties(**filters):
+    return _iter_pages("properties", filters or None)
+
+def get_properties(**filters):
+    return _get_all("properties", filters)
 
 def add_property(data):
-    resp = requests.post(f"{API_BASE}/properties/", json=data)
-    return _handle_response(resp)
+    resp = _post(f"{API_BASE}/properties/", json=data)
+    return _invalidate(_handle_response(resp))
 
 # Expense endpoints
-def get_expenses():
-    resp = requests.get(f"{API_BASE}/expenses/")
-    return _handle_response(resp) or []
+def iter_expenses(**filters):
+    return _iter_pages("expenses", filters or None)
+
+def get_expenses(fmt=None, per_unit=False, per_sqft=False, **filters):
+    """
+    List of expense dicts, or with fmt='arrow'|'parquet'|'csv' (see
+    EXPENSE_FORMAT) a DataFrame decoded straight from a columnar response.
+    per_unit / per_sqft divide the category amounts on the server.
+    """
+    filters = _normalized(filters, per_unit, per_sqft)
+    if fmt:
+        return _get_frame("expenses", filters, fmt)
+    return _get_all("expenses", filters)
+
+def export_expenses(dest, fmt="csv", **filters):
+    """
+    Stream /api/export/ (every matching month with its property's metadata,
+    fmt='csv'|'xlsx') into `dest`, a path or binary file, without holding
+    the export in memory. Returns the bytes written, or None on failure;
+    the server refuses XLSX over EXPORT_XLSX_MAX_ROWS rows, CSV has no cap.
+    """
+    params = {**(filters or {}), 'format': fmt}
+    resp = _send('get', f"{API_BASE}/export/", params=params, stream=True)
+    if resp is None:
+        return None
+    with resp:
+        if not resp.ok:
+            return _handle_response(resp)
+        out = open(dest, 'wb') if isinstance(dest, (str, os.PathLike)) else dest
+        written = 0
+        try:
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                written += out.write(chunk)
+        finally:
+            if out is not dest:
+                out.close()
+    return written
 
 def add_expense(data):
-    resp = requests.post(f"{API_BASE}/expenses/", json=data)
-    return _handle_response(resp)
-def get_units(property_id=None):
-    url = f"{API_BASE}/units/"
+    resp = _post(f"{API_BASE}/expenses/", json=data)
+    return _invalidate(_handle_response(resp))
+
+def add_expenses(rows):
+    """Batch counterpart of add_expense: upserts on (property, year, month)."""
+    return _invalidate(_post_bulk("expenses", rows))
+
+def get_trailing(window, property_ids=None, per_unit=False, per_sqft=False, **filters):
+    """
+    Server-side T12/T3 totals: one row per property with the nine category
+    sums plus months/start_*/end_* describing the window actually covered.
+    """
+    params = {'window': window, **filters}
+    if property_ids:
+        params['property'] = ','.join(str(int(i)) for i in property_ids)
+    _normalized(params, per_unit, per_sqft)
+    def fetch():
+        resp = _get(f"{API_BASE}/expenses/trailing/", params=params)
+        return _handle_response(resp)
+    return _cached("expenses/trailing", params, fetch) or []
+
+# Analytics endpoints
+def get_distribution(category, per_unit=False, per_sqft=False, **filters):
+    """
+    Server-computed box-plot stats for one category: a dict with
+    'properties' and 'property_types' lists of quartiles, whiskers and
+    outliers, sized by property count rather than expense rows.
+    """
+    params = _normalized({'category': category, **filters}, per_unit, per_sqft)
+    def fetch():
+        return _handle_response(_get(f"{API_BASE}/analytics/distribution/", params=params))
+    return _cached("analytics/distribution", params, fetch) or {'properties': [], 'property_types': []}
+
+def iter_units(property_id=None, **filters):
     if property_id is not None:
-        url += f"?property={property_id}"
-    resp = requests.get(url)
-    resp.raise_for_status()
-    return pd.DataFrame(resp.json())
+        filters['property'] = property_id
+    return _iter_pages("units", filters or None)
+
+def get_units(property_id=None, **filters):
+    if property_id is not None:
+        filters['property'] = property_id
+    return pd.DataFrame(_get_all("units", filters))
 
 def add_unit(unit):
     """
@@ -48,6 +490,39 @@ def add_unit(unit):
       'square_footage': <float>
     }
     """
-    resp = requests.post(f"{API_BASE}/units/", json=unit)
+    resp = _session.post(f"{API_BASE}/units/", json=unit, timeout=REQUEST_TIMEOUT)
     resp.raise_for_status()
-    return resp.json()
\ No newline at end of file
+    return _invalidate(resp.json())
+
+def add_units(units):
+    """Batch counterpart of add_unit: upserts on (property, unit_number)."""
+    return _invalidate(_post_bulk("units", units))
+
+# Import jobs: the file is parsed and written by a server-side worker
+def start_import(kind, uploaded, property_id=None):
+    """
+    Upload an expense ('expenses') or unit ('units', needs property_id)
+    template as a background ImportJob. Returns the queued job or None.
+    """
+    data = {'kind': kind}
+    if property_id is not None:
+        data['property'] = int(property_id)
+    files = {'file': (uploaded.name, uploaded.getvalue())}
+    return _handle_response(_post(f"{API_BASE}/imports/", data=data, files=files))
+
+def get_import(job_id):
+    """Current status of an import job. Never cached: it is meant to be polled."""
+    return _handle_response(_get(f"{API_BASE}/imports/{job_id}/"))
+
+def fetch_concurrently(*calls, max_workers=8):
+    """
+    Run zero-argument callables (e.g. lambda: get_expenses(**filters)) on a
+    thread pool and return their results in order, so a page waits for the
+    slowest request rather than the sum of all of them.
+    """
+    ctx = get_script_run_ctx()  # lets worker threads call st.error
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(calls)) or 1,
+        initializer=lambda: add_script_run_ctx(ctx=ctx),
+    ) as pool:
+        return [f.result() for f in [pool.submit(call) for call in calls]]